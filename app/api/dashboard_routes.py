@@ -1,14 +1,13 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import date, datetime, timedelta
-from typing import Optional
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
 
 from app.database import get_db
-from app.models.procedimento import Procedimento
-from app.models.medico import Medico
-from app.models.paciente import Paciente
-from app.models.tipo_procedimento import TipoProcedimento
+from app.services import dashboard as dashboard_service
+from app.services import ranking as ranking_service
+from app.services.dashboard_cache import dashboard_cache
 from app.api.deps import get_current_user
 from app.models.user import User
 
@@ -27,142 +26,17 @@ def dashboard_stats(
     
     - **data_inicio**: Filtrar procedimentos a partir desta data
     - **data_fim**: Filtrar procedimentos até esta data
-    """
-    
-    # Totais gerais
-    total_medicos = db.query(func.count(Medico.id)).filter(Medico.ativo == True).scalar()
-    total_pacientes = db.query(func.count(Paciente.id)).scalar()
-    total_tipos = db.query(func.count(TipoProcedimento.id)).filter(TipoProcedimento.ativo == True).scalar()
-    
-    # Query base de procedimentos
-    proc_query = db.query(Procedimento)
-    
-    if data_inicio:
-        proc_query = proc_query.filter(Procedimento.data >= data_inicio)
-    
-    if data_fim:
-        proc_query = proc_query.filter(Procedimento.data <= data_fim)
-    
-    total_procedimentos = proc_query.count()
-    
-    # Valor total de procedimentos
-    valor_total = db.query(func.sum(Procedimento.valor)).filter(
-        Procedimento.valor.isnot(None)
-    ).scalar() or 0
-    
-    if data_inicio:
-        valor_total = db.query(func.sum(Procedimento.valor)).filter(
-            Procedimento.valor.isnot(None),
-            Procedimento.data >= data_inicio
-        ).scalar() or 0
-    
-    if data_fim:
-        valor_total = db.query(func.sum(Procedimento.valor)).filter(
-            Procedimento.valor.isnot(None),
-            Procedimento.data <= data_fim
-        ).scalar() or 0
-    
-    # Procedimentos do mês atual
-    hoje = date.today()
-    primeiro_dia_mes = date(hoje.year, hoje.month, 1)
-    
-    procedimentos_mes = db.query(func.count(Procedimento.id)).filter(
-        Procedimento.data >= primeiro_dia_mes
-    ).scalar()
-    
-    # Top 5 médicos (mais procedimentos)
-    top_medicos = db.query(
-        Medico.id,
-        Medico.nome,
-        func.count(Procedimento.id).label('total')
-    ).join(
-        Procedimento, Medico.id == Procedimento.medico_id
-    ).group_by(
-        Medico.id, Medico.nome
-    ).order_by(
-        func.count(Procedimento.id).desc()
-    ).limit(5).all()
-    
-    # Top 5 tipos de procedimento
-    top_tipos = db.query(
-        TipoProcedimento.id,
-        TipoProcedimento.nome,
-        func.count(Procedimento.id).label('total')
-    ).join(
-        Procedimento, TipoProcedimento.id == Procedimento.tipo_id
-    ).group_by(
-        TipoProcedimento.id, TipoProcedimento.nome
-    ).order_by(
-        func.count(Procedimento.id).desc()
-    ).limit(5).all()
-    
-    # Procedimentos por mês (últimos 6 meses)
-    seis_meses_atras = hoje - timedelta(days=180)
-    
-    procedimentos_por_mes = db.query(
-        extract('year', Procedimento.data).label('ano'),
-        extract('month', Procedimento.data).label('mes'),
-        func.count(Procedimento.id).label('total')
-    ).filter(
-        Procedimento.data >= seis_meses_atras
-    ).group_by(
-        extract('year', Procedimento.data),
-        extract('month', Procedimento.data)
-    ).order_by(
-        extract('year', Procedimento.data),
-        extract('month', Procedimento.data)
-    ).all()
-    
-    # Últimos 10 procedimentos
-    ultimos_procedimentos = db.query(Procedimento).order_by(
-        Procedimento.data.desc()
-    ).limit(10).all()
     
-    return {
-        "totais": {
-            "medicos": total_medicos,
-            "pacientes": total_pacientes,
-            "tipos_procedimento": total_tipos,
-            "procedimentos": total_procedimentos,
-            "procedimentos_mes_atual": procedimentos_mes,
-            "valor_total": float(valor_total)
-        },
-        "top_medicos": [
-            {
-                "id": str(m.id),
-                "nome": m.nome,
-                "total_procedimentos": m.total
-            }
-            for m in top_medicos
-        ],
-        "top_tipos": [
-            {
-                "id": str(t.id),
-                "nome": t.nome,
-                "total": t.total
-            }
-            for t in top_tipos
-        ],
-        "procedimentos_por_mes": [
-            {
-                "ano": int(p.ano),
-                "mes": int(p.mes),
-                "total": p.total
-            }
-            for p in procedimentos_por_mes
-        ],
-        "ultimos_procedimentos": [
-            {
-                "id": str(p.id),
-                "data": p.data.isoformat(),
-                "tipo": p.tipo.nome,
-                "medico": p.medico.nome,
-                "paciente": p.paciente.nome,
-                "valor": float(p.valor) if p.valor else None
-            }
-            for p in ultimos_procedimentos
-        ]
-    }
+    O período vale para todas as métricas de procedimentos (totais, valor,
+    top 5, série mensal e últimos procedimentos). Tudo é calculado em uma
+    única consulta (ver app/services/dashboard.py) e guardado em cache até
+    a próxima escrita (ver app/services/dashboard_cache.py).
+    """
+    # Mês atual e série padrão dependem do dia de hoje
+    key = ("stats", data_inicio, data_fim, date.today())
+    return dashboard_cache.get_or_compute(
+        key, lambda: dashboard_service.dashboard_stats(db, data_inicio, data_fim)
+    )
 
 
 @router.get("/relatorio-mensal")
@@ -174,50 +48,172 @@ def relatorio_mensal(
 ):
     """
     Relatório detalhado de um mês específico
+    
+    Totais por tipo e por médico agregados no banco (GROUP BY), lidos do
+    rollup mensal ou, com DASHBOARD_ROLLUP=False, de procedimentos.
+    Guardado em cache até a próxima escrita.
+    """
+    return dashboard_cache.get_or_compute(
+        ("relatorio-mensal", ano, mes), lambda: dashboard_service.relatorio_mensal(db, ano, mes)
+    )
+
+
+@router.get("/series")
+def serie_temporal(
+    granularidade: str = Query("month", pattern="^(day|week|month|quarter)$"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    medico_id: Optional[UUID] = None,
+    tipo_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Série temporal de procedimentos (quantidade e valor por período)
+    
+    - **granularidade**: day, week, month ou quarter (default: month)
+    - **data_inicio**: Início da série (default: últimos 30 dias / 12 semanas / 12 meses / 8 trimestres)
+    - **data_fim**: Fim da série (default: hoje)
+    - **medico_id**: Filtrar por médico
+    - **tipo_id**: Filtrar por tipo de procedimento
+    
+    Períodos sem procedimentos vêm com total 0 (a série não tem buracos).
+    """
+    data_fim = data_fim or date.today()
+    data_inicio = data_inicio or dashboard_service.periodo_padrao_serie(granularidade, data_fim)
+    
+    if data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+    
+    if dashboard_service.contar_pontos(data_inicio, data_fim, granularidade) > dashboard_service.MAX_PONTOS_SERIE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Período muito longo para a granularidade '{granularidade}' "
+                   f"(máximo de {dashboard_service.MAX_PONTOS_SERIE} pontos)"
+        )
+    
+    key = ("series", granularidade, data_inicio, data_fim, medico_id, tipo_id)
+    return dashboard_cache.get_or_compute(
+        key, lambda: dashboard_service.serie_temporal(db, granularidade, data_inicio, data_fim, medico_id, tipo_id)
+    )
+
+
+def parse_lista(valor: str, permitidos, campo: str) -> List[str]:
+    """'a,b,c' -> ['a', 'b', 'c'], validando contra os valores permitidos"""
+    itens = [item.strip() for item in valor.split(",") if item.strip()]
+    invalidos = [item for item in itens if item not in permitidos]
+    if invalidos or not itens or len(set(itens)) != len(itens):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{campo} inválido: use valores distintos entre {', '.join(permitidos)}"
+        )
+    return itens
+
+
+@router.get("/cube")
+def cubo(
+    dimensoes: str = Query("medico,tipo,mes", description="Lista separada por vírgula: medico, tipo, paciente, mes, ano"),
+    medidas: str = Query("count,sum", description="Lista separada por vírgula: count, sum, avg"),
+    subtotais: str = Query("rollup", pattern="^(none|rollup|cube)$"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Tabela dinâmica de procedimentos (ex: médico x tipo x mês)
+    
+    - **dimensoes**: medico, tipo, paciente, mes, ano (na ordem dos subtotais)
+    - **medidas**: count (quantidade), sum (soma do valor), avg (valor médio)
+    - **subtotais**: none, rollup (hierárquicos + total geral) ou cube (todas as combinações)
+    - **data_inicio** / **data_fim**: Período
+    
+    Calculado em uma consulta (GROUPING SETS) e devolvido em formato
+    colunar: `colunas` tem uma lista por dimensão/medida, todas do mesmo
+    tamanho. Em subtotais, as dimensões agregadas vêm null.
+    """
+    lista_dimensoes = parse_lista(dimensoes, list(dashboard_service.DIMENSOES_CUBO), "dimensoes")
+    lista_medidas = parse_lista(medidas, list(dashboard_service.MEDIDAS_CUBO), "medidas")
+    
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+    
+    key = ("cube", tuple(lista_dimensoes), tuple(lista_medidas), subtotais, data_inicio, data_fim)
+    try:
+        return dashboard_cache.get_or_compute(
+            key, lambda: dashboard_service.cubo(db, lista_dimensoes, lista_medidas, subtotais, data_inicio, data_fim)
+        )
+    except dashboard_service.CuboMuitoGrande as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/valores")
+def distribuicao_valores(
+    agrupar_por: str = Query("tipo", pattern="^(geral|tipo|medico)$"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    faixas: int = Query(10, ge=1, le=100, description="Intervalos do histograma"),
+    amostra: Optional[float] = Query(None, gt=0, le=100, description="Porcentagem da tabela a ler (aproximado)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Distribuição do valor dos procedimentos
+    
+    - **agrupar_por**: geral, tipo ou medico
+    - **data_inicio** / **data_fim**: Período
+    - **faixas**: Número de intervalos do histograma (default: 10)
+    - **amostra**: Calcular sobre uma amostra (% da tabela) - mais rápido em bases grandes
+    
+    Por grupo: quantidade, mínimo, máximo, média, desvio padrão, p50/p90/p99
+    e histograma. Procedimentos sem valor são ignorados.
+    """
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+    
+    key = ("valores", agrupar_por, data_inicio, data_fim, faixas, amostra)
+    return dashboard_cache.get_or_compute(
+        key, lambda: dashboard_service.distribuicao_valores(db, agrupar_por, data_inicio, data_fim, faixas, amostra)
+    )
+
+
+@router.get("/ranking")
+def ranking(
+    dimensao: str = Query("medico", pattern="^(medico|tipo|paciente)$"),
+    ordem: str = Query("total", pattern="^(total|valor)$"),
+    ano: Optional[int] = Query(None, ge=2020, le=2100),
+    mes: Optional[int] = Query(None, ge=1, le=12),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
+    Top N médicos, tipos ou pacientes (pré-calculado)
     
-    # Procedimentos do mês
-    procedimentos = db.query(Procedimento).filter(
-        extract('year', Procedimento.data) == ano,
-        extract('month', Procedimento.data) == mes
-    ).all()
-    
-    total_procedimentos = len(procedimentos)
-    valor_total = sum(float(p.valor) if p.valor else 0 for p in procedimentos)
-    
-    # Agrupar por tipo
-    por_tipo = {}
-    for p in procedimentos:
-        tipo_nome = p.tipo.nome
-        if tipo_nome not in por_tipo:
-            por_tipo[tipo_nome] = {"quantidade": 0, "valor": 0}
-        por_tipo[tipo_nome]["quantidade"] += 1
-        por_tipo[tipo_nome]["valor"] += float(p.valor) if p.valor else 0
-    
-    # Agrupar por médico
-    por_medico = {}
-    for p in procedimentos:
-        medico_nome = p.medico.nome
-        if medico_nome not in por_medico:
-            por_medico[medico_nome] = {"quantidade": 0, "valor": 0}
-        por_medico[medico_nome]["quantidade"] += 1
-        por_medico[medico_nome]["valor"] += float(p.valor) if p.valor else 0
+    - **dimensao**: medico, tipo ou paciente
+    - **ordem**: total (quantidade de procedimentos) ou valor (faturamento)
+    - **ano** + **mes**: Ranking de um mês (sem eles: todo o histórico)
+    - **limit**: Quantidade de posições (default: 10)
+    """
+    if (ano is None) != (mes is None):
+        raise HTTPException(status_code=400, detail="Informe ano e mes juntos (ou nenhum, para o histórico todo)")
     
+    periodo = f"{ano:04d}-{mes:02d}" if ano else ranking_service.PERIODO_TOTAL
     return {
-        "periodo": {
-            "ano": ano,
-            "mes": mes
-        },
-        "resumo": {
-            "total_procedimentos": total_procedimentos,
-            "valor_total": valor_total
-        },
-        "por_tipo": [
-            {"tipo": tipo, "quantidade": dados["quantidade"], "valor": dados["valor"]}
-            for tipo, dados in por_tipo.items()
-        ],
-        "por_medico": [
-            {"medico": medico, "quantidade": dados["quantidade"], "valor": dados["valor"]}
-            for medico, dados in por_medico.items()
-        ]
+        "dimensao": dimensao,
+        "ordem": ordem,
+        "periodo": periodo,
+        "itens": ranking_service.top(db, dimensao, periodo, ordem, limit)
     }
+
+
+@router.get("/cache")
+def dashboard_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Métricas do cache do dashboard (monitoramento)
+    
+    Acertos (hits), falhas (misses), chaves em memória e versão atual dos dados
+    """
+    return dashboard_cache.stats()
@@ -1,211 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+import shutil
+import tempfile
+from itertools import chain
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import Dict
-
-from app.database import get_db
-from app.models.medico import Medico
-from app.models.paciente import Paciente
-from app.models.tipo_procedimento import TipoProcedimento
-from app.models.procedimento import Procedimento
-from app.schemas.import_schema import ImportRequest, ImportResult, ImportRow
+from typing import Iterable, Iterator, Optional, Union
+
+from app.database import SessionLocal, get_db
+from app.schemas.import_schema import ImportJobStatus, ImportRequest, ImportResult, ImportRow
+from app.services.import_engine import ImportEngine
+from app.services.import_files import ImportFileError, batched, iter_file_rows
+from app.services.import_jobs import ImportJob, ImportQueueFull, job_registry
+from app.services.idempotency import import_results
 from app.api.deps import get_current_user
 from app.models.user import User
 
 router = APIRouter(prefix="/import", tags=["import"])
 
 
-def parse_date(date_str: str) -> datetime.date:
-    """Converte string de data para date object"""
-    # Tentar formato ISO (YYYY-MM-DD)
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except ValueError:
-        pass
-    
-    # Tentar formato brasileiro (DD/MM/YYYY)
-    try:
-        return datetime.strptime(date_str, "%d/%m/%Y").date()
-    except ValueError:
-        raise ValueError(f"Formato de data inválido: {date_str}. Use YYYY-MM-DD ou DD/MM/YYYY")
-
+def idempotency_scope(user: User, key: Optional[str]) -> Optional[str]:
+    """Chave de idempotência por usuário (None se o header não foi enviado)"""
+    if not key:
+        return None
+    return f"{user.id}:{key}"
 
-def normalize_name(name: str) -> str:
-    """Normaliza nome para comparação"""
-    return name.strip().lower()
 
+def cached_response(cached, response: Response):
+    """Resposta a partir de um resultado guardado por Idempotency-Key"""
+    if isinstance(cached, ImportJob):
+        response.status_code = status.HTTP_202_ACCEPTED
+        return cached.to_status()
+    return cached
 
-def get_or_create_medico(db: Session, nome: str) -> Medico:
-    """Busca médico por nome ou cria se não existir"""
-    nome_normalizado = normalize_name(nome)
-    
-    # Buscar médico existente (case-insensitive)
-    medico = db.query(Medico).filter(
-        Medico.nome.ilike(nome.strip())
-    ).first()
-    
-    if medico:
-        return medico
-    
-    # Criar novo médico
-    medico = Medico(
-        nome=nome.strip(),
-        crm=None,  # Será preenchido manualmente depois
-        especialidade="A definir",
-        ativo=True
-    )
-    db.add(medico)
-    db.flush()  # Flush para obter o ID sem commit
-    
-    return medico
 
+def dry_run_lines(rows: Iterable[ImportRow]) -> Iterator[str]:
+    """
+    Linhas NDJSON do dry run: um objeto por linha da planilha e, no fim,
+    {"result": ImportResult} com o que o import faria
 
-def get_or_create_paciente(db: Session, nome: str) -> Paciente:
-    """Busca paciente por nome ou cria se não existir"""
-    nome_normalizado = normalize_name(nome)
-    
-    # Buscar paciente existente (case-insensitive)
-    paciente = db.query(Paciente).filter(
-        Paciente.nome.ilike(nome.strip())
-    ).first()
-    
-    if paciente:
-        return paciente
-    
-    # Criar novo paciente
-    paciente = Paciente(
-        nome=nome.strip(),
-        cpf=None,
-        data_nascimento=None
-    )
-    db.add(paciente)
-    db.flush()
-    
-    return paciente
+    Usa sessão própria: o gerador roda depois que o endpoint retorna.
+    Nada é gravado (a transação é desfeita no final).
+    """
+    db = SessionLocal()
+    try:
+        importer = ImportEngine(db)
+        for item in importer.dry_run(batched(rows, importer.batch_size)):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        yield json.dumps({"result": importer.result().model_dump()}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"detail": f"Erro na validação: {str(e)}"}, ensure_ascii=False) + "\n"
+    finally:
+        db.rollback()
+        db.close()
 
 
-def get_or_create_tipo(db: Session, nome: str) -> TipoProcedimento:
-    """Busca tipo de procedimento por nome ou cria se não existir"""
-    nome_normalizado = normalize_name(nome)
-    
-    # Buscar tipo existente (case-insensitive)
-    tipo = db.query(TipoProcedimento).filter(
-        TipoProcedimento.nome.ilike(nome.strip())
-    ).first()
-    
-    if tipo:
-        return tipo
-    
-    # Criar novo tipo
-    tipo = TipoProcedimento(
-        nome=nome.strip(),
-        descricao="Criado automaticamente via importação",
-        valor_referencia=0.00,
-        ativo=True
-    )
-    db.add(tipo)
-    db.flush()
-    
-    return tipo
+def dry_run_response(rows: Iterable[ImportRow], background: Optional[BackgroundTask] = None) -> StreamingResponse:
+    """Resposta em streaming (application/x-ndjson) do dry run"""
+    return StreamingResponse(dry_run_lines(rows), media_type="application/x-ndjson", background=background)
 
 
-@router.post("/procedimentos", response_model=ImportResult)
+@router.post("/procedimentos", response_model=Union[ImportResult, ImportJobStatus])
 def import_procedimentos(
     data: ImportRequest,
+    response: Response,
+    background: bool = Query(False, description="Rodar em background e retornar o id do job"),
+    dry_run: bool = Query(False, description="Só validar, sem gravar (resposta em NDJSON)"),
+    chunk_size: Optional[int] = Query(None, ge=1, description="Gravar (commit) a cada N linhas"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Importa procedimentos em lote a partir de dados CSV
     
-    Para cada linha:
-    - Cria médico se não existir (por nome)
-    - Cria paciente se não existir (por nome)
-    - Cria tipo de procedimento se não existir (por nome)
-    - Cria o procedimento
+    Processamento em lote (set-based):
+    - Resolve médicos, pacientes e tipos distintos com uma consulta por tabela
+    - Cria os que não existem com um único INSERT ... RETURNING
+    - Insere os procedimentos em lotes de IMPORT_BATCH_SIZE linhas
+    
+    - **background**: se true, retorna 202 com o status do job imediatamente;
+      acompanhe em GET /import/jobs/{id}. Com IMPORT_JOBS_MAX_PENDING jobs
+      na fila, responde 503 (tente de novo depois do Retry-After)
+    - **chunk_size**: grava a cada N linhas; uma parte com erro é desfeita
+      sozinha. Com Idempotency-Key, um import interrompido retoma da
+      última parte gravada
+    - **dry_run**: valida datas, campos obrigatórios e a resolução de médicos,
+      pacientes e tipos sem gravar nada. A resposta é NDJSON, uma linha por
+      linha da planilha, enviada à medida que os lotes são validados
+    - **Idempotency-Key** (header): repetir a chave devolve o resultado anterior
+    
+    Linhas já importadas (mesma data, tipo, médico e paciente) são ignoradas
+    e contadas em `duplicates`.
     
     Retorna estatísticas de importação
     """
     
-    errors = []
-    success_count = 0
+    if dry_run:
+        return dry_run_response(data.rows)
     
-    # Contadores de entidades criadas
-    medicos_criados = set()
-    pacientes_criados = set()
-    tipos_criados = set()
+    cache_key = idempotency_scope(current_user, idempotency_key)
+    if cache_key:
+        cached = import_results.get(cache_key)
+        if cached is not None:
+            return cached_response(cached, response)
     
-    # Processar cada linha
-    for idx, row in enumerate(data.rows, start=1):
+    if background:
         try:
-            # Validar dados obrigatórios
-            if not row.data:
-                errors.append({"row": idx, "message": "Data é obrigatória"})
-                continue
-            
-            if not row.nomeProcedimento:
-                errors.append({"row": idx, "message": "Nome do procedimento é obrigatório"})
-                continue
-            
-            if not row.nomeMedicos:
-                errors.append({"row": idx, "message": "Nome do médico é obrigatório"})
-                continue
-            
-            if not row.nomePaciente:
-                errors.append({"row": idx, "message": "Nome do paciente é obrigatório"})
-                continue
-            
-            # Converter data
-            try:
-                data_procedimento = parse_date(row.data)
-            except ValueError as e:
-                errors.append({"row": idx, "message": str(e)})
-                continue
-            
-            # Buscar ou criar médico
-            medico = get_or_create_medico(db, row.nomeMedicos)
-            if str(medico.id) not in [str(m.id) for m in db.new]:
-                # Se foi criado agora, adicionar ao contador
-                if medico.created_at and (datetime.utcnow() - medico.created_at).seconds < 5:
-                    medicos_criados.add(str(medico.id))
-            else:
-                medicos_criados.add(str(medico.id))
-            
-            # Buscar ou criar paciente
-            paciente = get_or_create_paciente(db, row.nomePaciente)
-            if str(paciente.id) not in [str(p.id) for p in db.new]:
-                if paciente.created_at and (datetime.utcnow() - paciente.created_at).seconds < 5:
-                    pacientes_criados.add(str(paciente.id))
-            else:
-                pacientes_criados.add(str(paciente.id))
-            
-            # Buscar ou criar tipo
-            tipo = get_or_create_tipo(db, row.nomeProcedimento)
-            if str(tipo.id) not in [str(t.id) for t in db.new]:
-                if tipo.created_at and (datetime.utcnow() - tipo.created_at).seconds < 5:
-                    tipos_criados.add(str(tipo.id))
-            else:
-                tipos_criados.add(str(tipo.id))
-            
-            # Criar procedimento
-            procedimento = Procedimento(
-                data=data_procedimento,
-                tipo_id=tipo.id,
-                medico_id=medico.id,
-                paciente_id=paciente.id,
-                valor=tipo.valor_referencia if tipo.valor_referencia else None,
-                observacoes=None
+            job = job_registry.submit(data.rows, chunk_size=chunk_size, checkpoint_key=cache_key,
+                                      owner_id=str(current_user.id))
+        except ImportQueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "60"}
             )
-            db.add(procedimento)
-            success_count += 1
-            
-        except Exception as e:
-            errors.append({"row": idx, "message": f"Erro inesperado: {str(e)}"})
-            continue
-    
-    # Commit de tudo de uma vez
+        if cache_key:
+            import_results.set(cache_key, job)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return job.to_status()
+    
+    importer = ImportEngine(db)
+    
     try:
-        db.commit()
+        importer.execute(data.rows, chunk_size=chunk_size, checkpoint_key=cache_key)
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -213,33 +132,103 @@ def import_procedimentos(
             detail=f"Erro ao salvar no banco de dados: {str(e)}"
         )
     
-    # Preparar warnings
-    warnings = []
-    if len(medicos_criados) > 0:
-        warnings.append(
-            f"{len(medicos_criados)} médico(s) foram criados automaticamente. "
-            "Edite os registros para adicionar CRM e especialidade."
-        )
-    if len(pacientes_criados) > 0:
-        warnings.append(
-            f"{len(pacientes_criados)} paciente(s) foram criados automaticamente. "
-            "Complete os dados cadastrais (CPF, telefone, etc)."
+    result = importer.result()
+    if cache_key:
+        import_results.set(cache_key, result)
+    
+    return result
+
+
+@router.post("/procedimentos/upload", response_model=Union[ImportResult, ImportJobStatus])
+def import_procedimentos_upload(
+    response: Response,
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="Só validar, sem gravar (resposta em NDJSON)"),
+    chunk_size: Optional[int] = Query(None, ge=1, description="Gravar (commit) a cada N linhas"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Importa procedimentos a partir de um arquivo CSV ou XLSX
+    
+    O arquivo é lido em lotes de IMPORT_BATCH_SIZE linhas e cada lote vai
+    direto para o engine de importação, então o uso de memória não cresce
+    com o tamanho do arquivo.
+    
+    Colunas: data, nome do procedimento, nome dos medicos, nome do paciente
+    
+    Aceita `dry_run`, `chunk_size` e o header Idempotency-Key, como
+    POST /procedimentos. Se a chave já foi usada num import em background,
+    devolve o status do job (202).
+    
+    Retorna estatísticas de importação (mesmo formato de /procedimentos)
+    """
+    
+    if dry_run:
+        # O upload é fechado quando o endpoint retorna, antes do streaming:
+        # copiar para um arquivo temporário que vive até o fim da resposta
+        copia = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        shutil.copyfileobj(file.file, copia)
+        copia.seek(0)
+        try:
+            rows = iter_file_rows(copia, file.filename)
+            first = next(rows, None)  # Valida o cabeçalho antes de começar a resposta
+        except ImportFileError as e:
+            copia.close()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        rows = chain([first], rows) if first else []
+        return dry_run_response(rows, background=BackgroundTask(copia.close))
+    
+    cache_key = idempotency_scope(current_user, idempotency_key)
+    if cache_key:
+        cached = import_results.get(cache_key)
+        if cached is not None:
+            return cached_response(cached, response)  # Pode ser um job de ?background=true
+    
+    importer = ImportEngine(db)
+    
+    try:
+        rows = iter_file_rows(file.file, file.filename)
+        importer.execute(rows, chunk_size=chunk_size, checkpoint_key=cache_key)
+    except ImportFileError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    if len(tipos_criados) > 0:
-        warnings.append(
-            f"{len(tipos_criados)} tipo(s) de procedimento foram criados. "
-            "Configure os valores de referência."
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao salvar no banco de dados: {str(e)}"
         )
     
-    # Retornar resultado
-    return ImportResult(
-        success=success_count,
-        errors=errors,
-        created={
-            "medicos": len(medicos_criados),
-            "pacientes": len(pacientes_criados),
-            "tiposProcedimento": len(tipos_criados),
-            "procedimentos": success_count
-        },
-        warnings=warnings
-    )
+    result = importer.result()
+    if cache_key:
+        import_results.set(cache_key, result)
+    
+    return result
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobStatus)
+def import_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Progresso de uma importação em background
+    
+    Retorna linhas processadas, linhas/segundo, erros até agora e, ao
+    final, o ImportResult completo. Só quem enviou o import vê o job
+    (404 para os demais)
+    """
+    job = job_registry.get(job_id, owner_id=str(current_user.id))
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de importação não encontrado")
+    
+    return job.to_status()
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -7,6 +8,7 @@ from app.database import get_db
 from app.models.medico import Medico
 from app.models.procedimento import Procedimento
 from app.schemas.import_schema import MedicoResponse
+from app.services import fieldsets, pagination, text_search
 from app.api.deps import get_current_user
 from app.models.user import User
 
@@ -18,6 +20,7 @@ def listar_medicos(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     search: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula (ex: id,nome)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -26,33 +29,29 @@ def listar_medicos(
     
     - **skip**: Pular N registros (paginação)
     - **limit**: Limitar quantidade de resultados
-    - **search**: Buscar por nome ou CRM
+    - **search**: Buscar por nome ou CRM (resultados por relevância)
+    - **fields**: Só estes campos (id, nome, crm, especialidade); o SELECT lê apenas essas colunas
     """
+    try:
+        campos = fieldsets.selecionar(fields, fieldsets.MEDICO)
+    except fieldsets.InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     query = db.query(Medico).filter(Medico.ativo == True)
     
-    # Filtro de busca
+    # Busca por relevância (índices de trigramas; CRM completo vai direto ao índice exato)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Medico.nome.ilike(search_filter)) |
-            (Medico.crm.ilike(search_filter))
-        )
-    
-    # Ordenar por nome
-    query = query.order_by(Medico.nome)
+        query = text_search.buscar(query, Medico, "crm", search)
+    else:
+        # Ordenar por nome
+        query = query.order_by(Medico.nome, Medico.id)
     
-    # Paginação
-    medicos = query.offset(skip).limit(limit).all()
+    # Paginação (só as colunas dos campos pedidos)
+    linhas = fieldsets.projetar(query, fieldsets.MEDICO, campos).offset(skip).limit(limit).all()
+    medicos = [fieldsets.montar(linha, fieldsets.MEDICO, campos) for linha in linhas]
     
-    return [
-        MedicoResponse(
-            id=str(m.id),
-            nome=m.nome,
-            crm=m.crm,
-            especialidade=m.especialidade
-        )
-        for m in medicos
-    ]
+    # Resposta parcial não segue o schema completo (MedicoResponse)
+    return JSONResponse(content=medicos) if fields else medicos
 
 
 @router.get("/{medico_id}", response_model=dict)
@@ -100,6 +99,8 @@ def procedimentos_do_medico(
     medico_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    paginacao: str = Query("offset", pattern="^(offset|cursor)$", description="offset (skip/limit) ou cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -112,9 +113,17 @@ def procedimentos_do_medico(
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
     # Buscar procedimentos
-    procedimentos = db.query(Procedimento).filter(
-        Procedimento.medico_id == medico_id
-    ).order_by(Procedimento.data.desc()).offset(skip).limit(limit).all()
+    query = pagination.com_relacionamentos(db.query(Procedimento)).filter(Procedimento.medico_id == medico_id)
+    
+    pagina = {}
+    if cursor or paginacao == "cursor":
+        try:
+            procedimentos, next_cursor = pagination.paginar(query, cursor, limit)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pagina = {"next_cursor": next_cursor}
+    else:
+        procedimentos = pagination.ordenar(query).offset(skip).limit(limit).all()
     
     return {
         "medico": {
@@ -131,5 +140,6 @@ def procedimentos_do_medico(
             }
             for p in procedimentos
         ],
-        "total": len(procedimentos)
+        "total": len(procedimentos),
+        **pagina
     }
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -7,6 +8,7 @@ from app.database import get_db
 from app.models.paciente import Paciente
 from app.models.procedimento import Procedimento
 from app.schemas.import_schema import PacienteResponse
+from app.services import fieldsets, pagination, text_search
 from app.api.deps import get_current_user
 from app.models.user import User
 
@@ -18,6 +20,7 @@ def listar_pacientes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     search: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula (ex: id,nome)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -26,32 +29,29 @@ def listar_pacientes(
     
     - **skip**: Pular N registros (paginação)
     - **limit**: Limitar quantidade de resultados
-    - **search**: Buscar por nome ou CPF
+    - **search**: Buscar por nome ou CPF (resultados por relevância)
+    - **fields**: Só estes campos (id, nome, cpf); o SELECT lê apenas essas colunas
     """
+    try:
+        campos = fieldsets.selecionar(fields, fieldsets.PACIENTE)
+    except fieldsets.InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     query = db.query(Paciente)
     
-    # Filtro de busca
+    # Busca por relevância (índices de trigramas; CPF completo vai direto ao índice exato)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Paciente.nome.ilike(search_filter)) |
-            (Paciente.cpf.ilike(search_filter))
-        )
-    
-    # Ordenar por nome
-    query = query.order_by(Paciente.nome)
+        query = text_search.buscar(query, Paciente, "cpf", search)
+    else:
+        # Ordenar por nome
+        query = query.order_by(Paciente.nome, Paciente.id)
     
-    # Paginação
-    pacientes = query.offset(skip).limit(limit).all()
+    # Paginação (só as colunas dos campos pedidos)
+    linhas = fieldsets.projetar(query, fieldsets.PACIENTE, campos).offset(skip).limit(limit).all()
+    pacientes = [fieldsets.montar(linha, fieldsets.PACIENTE, campos) for linha in linhas]
     
-    return [
-        PacienteResponse(
-            id=str(p.id),
-            nome=p.nome,
-            cpf=p.cpf
-        )
-        for p in pacientes
-    ]
+    # Resposta parcial não segue o schema completo (PacienteResponse)
+    return JSONResponse(content=pacientes) if fields else pacientes
 
 
 @router.get("/{paciente_id}", response_model=dict)
@@ -100,11 +100,16 @@ def procedimentos_do_paciente(
     paciente_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    paginacao: str = Query("offset", pattern="^(offset|cursor)$", description="offset (skip/limit) ou cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lista procedimentos de um paciente específico
+    
+    - **paginacao**: offset (skip/limit) ou cursor (next_cursor)
+    - **cursor**: Continuar a partir de uma página anterior (implica paginacao=cursor)
     """
     paciente = db.query(Paciente).filter(Paciente.id == paciente_id).first()
     
@@ -112,9 +117,17 @@ def procedimentos_do_paciente(
         raise HTTPException(status_code=404, detail="Paciente não encontrado")
     
     # Buscar procedimentos
-    procedimentos = db.query(Procedimento).filter(
-        Procedimento.paciente_id == paciente_id
-    ).order_by(Procedimento.data.desc()).offset(skip).limit(limit).all()
+    query = pagination.com_relacionamentos(db.query(Procedimento)).filter(Procedimento.paciente_id == paciente_id)
+    
+    pagina = {}
+    if cursor or paginacao == "cursor":
+        try:
+            procedimentos, next_cursor = pagination.paginar(query, cursor, limit)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pagina = {"next_cursor": next_cursor}
+    else:
+        procedimentos = pagination.ordenar(query).offset(skip).limit(limit).all()
     
     return {
         "paciente": {
@@ -131,5 +144,6 @@ def procedimentos_do_paciente(
             }
             for p in procedimentos
         ],
-        "total": len(procedimentos)
+        "total": len(procedimentos),
+        **pagina
     }
@@ -10,6 +10,7 @@ from app.models.medico import Medico
 from app.models.paciente import Paciente
 from app.models.tipo_procedimento import TipoProcedimento
 from app.schemas.import_schema import ProcedimentoResponse
+from app.services import counting, fieldsets, pagination
 from app.api.deps import get_current_user
 from app.models.user import User
 
@@ -20,11 +21,18 @@ router = APIRouter(prefix="/procedimentos", tags=["procedimentos"])
 def listar_procedimentos(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    paginacao: str = Query("offset", pattern="^(offset|cursor)$", description="offset (skip/limit) ou cursor"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    count: Optional[str] = Query(
+        None, pattern="^(exact|approximate|cached|none)$",
+        description="Como calcular o total (default: approximate; com cursor, none)"
+    ),
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
     medico_id: Optional[str] = None,
     paciente_id: Optional[str] = None,
     tipo_id: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula (ex: data,tipo.nome,valor)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -36,7 +44,24 @@ def listar_procedimentos(
     - **medico_id**: Filtrar por médico
     - **paciente_id**: Filtrar por paciente
     - **tipo_id**: Filtrar por tipo de procedimento
+    - **paginacao**: offset (skip/limit + total) ou cursor (next_cursor, sem total)
+    - **cursor**: Continuar a partir de uma página anterior (implica paginacao=cursor)
+    
+    - **count**: exact (COUNT a cada chamada), approximate (estimativa do
+      banco; exato abaixo de COUNT_EXACT_BELOW), cached (exato, guardado até a
+      próxima escrita) ou none
+    - **fields**: Só estes campos (id, data, tipo, tipo.id, tipo.nome,
+      tipo.valor_referencia, medico, medico.id, medico.nome, medico.crm,
+      paciente, paciente.id, paciente.nome, valor, observacoes). O SELECT lê
+      apenas as colunas e tabelas necessárias
+    
+    Com cursor, cada página custa o mesmo, por mais fundo que se role a lista.
     """
+    try:
+        campos = fieldsets.selecionar(fields, fieldsets.PROCEDIMENTO)
+    except fieldsets.InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     query = db.query(Procedimento)
     
     # Aplicar filtros
@@ -55,39 +80,34 @@ def listar_procedimentos(
     if tipo_id:
         query = query.filter(Procedimento.tipo_id == tipo_id)
     
-    # Contar total
-    total = query.count()
+    usa_cursor = bool(cursor) or paginacao == "cursor"
+    modo_count = count or ("none" if usa_cursor else "approximate")
+    
+    pagina = {}
+    if modo_count != "none":
+        # Contar total
+        chave = ("procedimentos", data_inicio, data_fim, medico_id, paciente_id, tipo_id)
+        pagina["total"], pagina["count"] = counting.contar(db, query, modo_count, chave)
     
-    # Ordenar por data (mais recentes primeiro)
-    procedimentos = query.order_by(Procedimento.data.desc()).offset(skip).limit(limit).all()
+    # Só as colunas (e JOINs) dos campos pedidos
+    if usa_cursor:
+        try:
+            linhas, next_cursor = pagination.paginar(
+                fieldsets.projetar(query, fieldsets.PROCEDIMENTO, campos, extras=("data", "id")), cursor, limit
+            )
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pagina.update({"next_cursor": next_cursor, "limit": limit})
+    else:
+        # Ordenar por data (mais recentes primeiro)
+        linhas = pagination.ordenar(
+            fieldsets.projetar(query, fieldsets.PROCEDIMENTO, campos)
+        ).offset(skip).limit(limit).all()
+        pagina.update({"skip": skip, "limit": limit})
     
     return {
-        "procedimentos": [
-            {
-                "id": str(p.id),
-                "data": p.data.isoformat(),
-                "tipo": {
-                    "id": str(p.tipo.id),
-                    "nome": p.tipo.nome,
-                    "valor_referencia": float(p.tipo.valor_referencia) if p.tipo.valor_referencia else None
-                },
-                "medico": {
-                    "id": str(p.medico.id),
-                    "nome": p.medico.nome,
-                    "crm": p.medico.crm
-                },
-                "paciente": {
-                    "id": str(p.paciente.id),
-                    "nome": p.paciente.nome
-                },
-                "valor": float(p.valor) if p.valor else None,
-                "observacoes": p.observacoes
-            }
-            for p in procedimentos
-        ],
-        "total": total,
-        "skip": skip,
-        "limit": limit
+        "procedimentos": [fieldsets.montar(linha, fieldsets.PROCEDIMENTO, campos) for linha in linhas],
+        **pagina
     }
 
 
@@ -100,7 +120,9 @@ def detalhe_procedimento(
     """
     Detalhes completos de um procedimento
     """
-    procedimento = db.query(Procedimento).filter(Procedimento.id == procedimento_id).first()
+    procedimento = pagination.com_relacionamentos(db.query(Procedimento)).filter(
+        Procedimento.id == procedimento_id
+    ).first()
     
     if not procedimento:
         raise HTTPException(status_code=404, detail="Procedimento não encontrado")
@@ -16,6 +16,33 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "MedControl API"
     DEBUG: bool = True
     
+    # Import
+    IMPORT_BATCH_SIZE: int = 1000  # Linhas por lote no INSERT em massa
+    IMPORT_COMMIT_EVERY: int = 0  # Commit a cada N linhas (0 = uma transação só)
+    IMPORT_CHECKPOINT_TTL_SECONDS: int = 86400  # Checkpoints sem atualização há mais que isso são apagados
+    IMPORT_WORKERS: int = 2  # Threads para imports em background
+    IMPORT_PREPROCESS_WORKERS: int = 0  # Processos para validar/converter linhas (0 = no próprio processo)
+    IMPORT_PREPROCESS_MIN_ROWS: int = 500  # Lotes menores que isso não vão para o pool
+    IMPORT_JOBS_MAX: int = 50  # Jobs finalizados mantidos em memória
+    IMPORT_JOBS_MAX_PENDING: int = 20  # Jobs na fila ou rodando; acima disso, 503
+    IMPORT_JOB_TTL_SECONDS: int = 3600  # Tempo de retenção de jobs finalizados
+    IMPORT_FUZZY_MATCH: bool = True  # Associar nomes parecidos a cadastros existentes
+    IMPORT_FUZZY_THRESHOLD: float = 0.75  # Similaridade mínima (Jaccard de trigramas, 0-1)
+    IMPORT_FUZZY_MAX_BLOCK: int = 200  # Blocos de matching maiores que isso são ignorados (custo por linha)
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # Validade do resultado por Idempotency-Key
+    IDEMPOTENCY_MAX_KEYS: int = 1000  # Chaves mantidas em memória
+    
+    # Dashboard
+    DASHBOARD_ROLLUP: bool = True  # Ler totais do rollup mensal (procedimentos_mensal)
+    DASHBOARD_CACHE_TTL_SECONDS: int = 300  # Validade das respostas em cache (0 = sem cache)
+    DASHBOARD_CACHE_MAX_KEYS: int = 256  # Respostas mantidas em memória
+    DASHBOARD_QUERY_WORKERS: int = 4  # Conexões extras para consultas em paralelo (0 = uma consulta só)
+    
+    # Listagens
+    COUNT_EXACT_BELOW: int = 10000  # count=approximate: abaixo desta estimativa, conta exato
+    COUNT_CACHE_TTL_SECONDS: int = 300  # count=cached: validade dos totais (0 = sem cache)
+    COUNT_CACHE_MAX_KEYS: int = 1000  # count=cached: combinações de filtros mantidas
+    
     # CORS
     CORS_ORIGINS: str = "https://medcontrol-paraizodaniels-projects.vercel.app,http://localhost:51731"
     
@@ -0,0 +1,23 @@
+"""
+Normalização de textos para comparação e busca
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(name: str) -> str:
+    """
+    Chave normalizada de um nome
+
+    Minúsculas, sem acentos, sem espaços nas pontas e com espaços internos
+    colapsados: "  Dr. JOÃO   Silva " -> "dr. joao silva"
+    """
+    if not name:
+        return ""
+    folded = unicodedata.normalize("NFKD", name)
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _WHITESPACE.sub(" ", folded).strip().lower()
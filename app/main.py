@@ -1,13 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import auth, import_routes, medicos_routes, pacientes_routes, procedimentos_routes, dashboard_routes, menu_routes
 from app.database import engine, Base
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicialização do servidor: criar tabelas no banco
+
+    Fica fora do nível do módulo porque os processos de pré-processamento
+    do import (spawn, ver app/services/import_preprocess.py) reimportam o
+    __main__ do pai: com `python -m app.main`, cada um rodaria o create_all
+    e abriria uma conexão.
+    """
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
 # Criar aplicação FastAPI
 app = FastAPI(
     title=settings.PROJECT_NAME,
     debug=settings.DEBUG,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
@@ -29,9 +46,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Criar tabelas no banco
-Base.metadata.create_all(bind=engine)
-
 # Incluir rotas
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(import_routes.router, prefix=settings.API_V1_PREFIX)
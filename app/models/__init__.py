@@ -3,6 +3,9 @@ from app.models.medico import Medico
 from app.models.paciente import Paciente
 from app.models.tipo_procedimento import TipoProcedimento
 from app.models.procedimento import Procedimento
+from app.models.procedimento_mensal import ProcedimentoMensal
+from app.models.ranking import Ranking
 from app.models.menu_item import MenuItem
+from app.models.import_checkpoint import ImportCheckpoint
 
-__all__ = ["User", "Medico", "Paciente", "TipoProcedimento", "Procedimento", "MenuItem"]
+__all__ = ["User", "Medico", "Paciente", "TipoProcedimento", "Procedimento", "ProcedimentoMensal", "Ranking", "MenuItem", "ImportCheckpoint"]
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, Boolean, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.database import Base
+
+
+class ImportCheckpoint(Base):
+    __tablename__ = "import_checkpoints"
+    
+    id = Column(String(255), primary_key=True)  # Idempotency-Key (por usuário) da importação
+    rows_committed = Column(Integer, default=0, nullable=False)  # Linhas já lidas (partes com erro ficam em state["failed"])
+    state = Column(JSONB, nullable=False, default=dict)  # Contadores e erros acumulados
+    finished = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ImportCheckpoint {self.id} - {self.rows_committed}>"
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, Index, String, Boolean, DateTime
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import validates
 from datetime import datetime
 import uuid
 from app.database import Base
+from app.core.text import normalize_name
 
 
 class Medico(Base):
@@ -10,6 +12,7 @@ class Medico(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nome = Column(String(255), nullable=False, index=True)
+    nome_normalizado = Column(String(255), nullable=False, index=True)  # Chave de busca/matching
     crm = Column(String(50), index=True)
     especialidade = Column(String(100))
     email = Column(String(255))
@@ -18,5 +21,19 @@ class Medico(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Homônimos são permitidos; o nome só é chave (import) entre cadastros sem CRM
+    __table_args__ = (
+        Index(
+            "ix_medicos_nome_normalizado_sem_crm", "nome_normalizado",
+            unique=True, postgresql_where=crm.is_(None)
+        ),
+    )
+    
+    @validates("nome")
+    def _atualizar_nome_normalizado(self, key, nome):
+        """Mantém nome_normalizado em sincronia com nome"""
+        self.nome_normalizado = normalize_name(nome)
+        return nome
+    
     def __repr__(self):
         return f"<Medico {self.nome}>"
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Date, DateTime, Text
+from sqlalchemy import Column, Index, String, Date, DateTime, Text
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import validates
 from datetime import datetime
 import uuid
 from app.database import Base
+from app.core.text import normalize_name
 
 
 class Paciente(Base):
@@ -10,6 +12,7 @@ class Paciente(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nome = Column(String(255), nullable=False, index=True)
+    nome_normalizado = Column(String(255), nullable=False, index=True)  # Chave de busca/matching
     cpf = Column(String(14), index=True)
     data_nascimento = Column(Date)
     telefone = Column(String(20))
@@ -19,5 +22,19 @@ class Paciente(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Homônimos são permitidos; o nome só é chave (import) entre cadastros sem CPF
+    __table_args__ = (
+        Index(
+            "ix_pacientes_nome_normalizado_sem_cpf", "nome_normalizado",
+            unique=True, postgresql_where=cpf.is_(None)
+        ),
+    )
+    
+    @validates("nome")
+    def _atualizar_nome_normalizado(self, key, nome):
+        """Mantém nome_normalizado em sincronia com nome"""
+        self.nome_normalizado = normalize_name(nome)
+        return nome
+    
     def __repr__(self):
         return f"<Paciente {self.nome}>"
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Date, DateTime, Text, Numeric, ForeignKey
+from sqlalchemy import Column, Date, DateTime, Index, String, Text, Numeric, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 import uuid
 from app.database import Base
@@ -10,12 +10,16 @@ class Procedimento(Base):
     __tablename__ = "procedimentos"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    data = Column(Date, nullable=False, index=True)
-    tipo_id = Column(UUID(as_uuid=True), ForeignKey('tipos_procedimento.id'), nullable=False, index=True)
-    medico_id = Column(UUID(as_uuid=True), ForeignKey('medicos.id'), nullable=False, index=True)
-    paciente_id = Column(UUID(as_uuid=True), ForeignKey('pacientes.id'), nullable=False, index=True)
+    # active_history: ao alterar, o valor antigo é carregado do banco mesmo com
+    # a instância expirada (rollup e rankings subtraem o valor antigo, ver
+    # app/services/rollup.py)
+    data = column_property(Column(Date, nullable=False, index=True), active_history=True)
+    tipo_id = column_property(Column(UUID(as_uuid=True), ForeignKey('tipos_procedimento.id'), nullable=False, index=True), active_history=True)
+    medico_id = column_property(Column(UUID(as_uuid=True), ForeignKey('medicos.id'), nullable=False, index=True), active_history=True)
+    paciente_id = column_property(Column(UUID(as_uuid=True), ForeignKey('pacientes.id'), nullable=False, index=True), active_history=True)
     observacoes = Column(Text)
-    valor = Column(Numeric(10, 2))
+    valor = column_property(Column(Numeric(10, 2)), active_history=True)
+    fingerprint = Column(String(64), unique=True, index=True)  # Hash da linha importada (evita duplicatas)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -24,5 +28,13 @@ class Procedimento(Base):
     medico = relationship("Medico")
     paciente = relationship("Paciente")
     
+    # Listagens paginadas por cursor: ORDER BY data DESC, id DESC (app/services/pagination.py)
+    # Bancos existentes: scripts/migrate_procedimentos_cursor.sql (create_all não cria índices)
+    __table_args__ = (
+        Index("ix_procedimentos_data_id", "data", "id"),
+        Index("ix_procedimentos_medico_data_id", "medico_id", "data", "id"),
+        Index("ix_procedimentos_paciente_data_id", "paciente_id", "data", "id"),
+    )
+    
     def __repr__(self):
         return f"<Procedimento {self.id} - {self.data}>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.database import Base
+
+
+class ProcedimentoMensal(Base):
+    """Totais de procedimentos por mês, médico e tipo (mantido em app/services/rollup.py)"""
+    __tablename__ = "procedimentos_mensal"
+    
+    mes = Column(Date, primary_key=True)  # Primeiro dia do mês
+    medico_id = Column(UUID(as_uuid=True), ForeignKey('medicos.id'), primary_key=True, index=True)
+    tipo_id = Column(UUID(as_uuid=True), ForeignKey('tipos_procedimento.id'), primary_key=True, index=True)
+    total = Column(Integer, default=0, nullable=False)  # Quantidade de procedimentos
+    valor = Column(Numeric(14, 2), default=0, nullable=False)  # Soma de procedimentos.valor
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ProcedimentoMensal {self.mes} {self.medico_id} {self.tipo_id} - {self.total}>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Index, Integer, Numeric, String
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from app.database import Base
+
+
+class Ranking(Base):
+    """Totais por médico / tipo / paciente, por mês e geral (mantido em app/services/ranking.py)"""
+    __tablename__ = "rankings"
+
+    dimensao = Column(String(10), primary_key=True)  # medico, tipo ou paciente
+    periodo = Column(String(7), primary_key=True)  # YYYY-MM ou "total"
+    entidade_id = Column(UUID(as_uuid=True), primary_key=True)  # id do médico / tipo / paciente
+    total = Column(Integer, default=0, nullable=False)  # Quantidade de procedimentos
+    valor = Column(Numeric(14, 2), default=0, nullable=False)  # Soma de procedimentos.valor
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Top N = leitura das N primeiras entradas do índice
+    __table_args__ = (
+        Index("ix_rankings_total", "dimensao", "periodo", total.desc(), valor.desc(), "entidade_id"),
+        Index("ix_rankings_valor", "dimensao", "periodo", valor.desc(), total.desc(), "entidade_id"),
+    )
+
+    def __repr__(self):
+        return f"<Ranking {self.dimensao} {self.periodo} {self.entidade_id} - {self.total}>"
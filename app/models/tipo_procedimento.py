@@ -1,8 +1,10 @@
 from sqlalchemy import Column, String, Boolean, DateTime, Text, Numeric
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import validates
 from datetime import datetime
 import uuid
 from app.database import Base
+from app.core.text import normalize_name
 
 
 class TipoProcedimento(Base):
@@ -10,11 +12,18 @@ class TipoProcedimento(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nome = Column(String(255), nullable=False, unique=True, index=True)
+    nome_normalizado = Column(String(255), nullable=False, unique=True, index=True)  # Chave de busca/matching
     descricao = Column(Text)
     valor_referencia = Column(Numeric(10, 2), default=0.00)
     ativo = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @validates("nome")
+    def _atualizar_nome_normalizado(self, key, nome):
+        """Mantém nome_normalizado em sincronia com nome"""
+        self.nome_normalizado = normalize_name(nome)
+        return nome
+    
     def __repr__(self):
         return f"<TipoProcedimento {self.nome}>"
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
 
 
 # ============================================
@@ -26,6 +26,21 @@ class ImportResult(BaseModel):
     errors: List[dict]  # Lista de erros: [{row: int, message: str}]
     created: dict  # Quantidades criadas: {medicos: int, pacientes: int, ...}
     warnings: List[str]  # Avisos gerais
+    duplicates: int = 0  # Linhas ignoradas por já terem sido importadas
+
+
+class ImportJobStatus(BaseModel):
+    """Status de uma importação em background"""
+    id: str
+    status: str  # pending | running | done | failed
+    rows_total: int
+    rows_processed: int
+    rows_per_second: float
+    errors: List[dict]  # Erros encontrados até agora: [{row: int, message: str}]
+    result: Optional[ImportResult] = None  # Preenchido quando status = done
+    detail: Optional[str] = None  # Mensagem de falha quando status = failed
+    created_at: datetime
+    finished_at: Optional[datetime] = None
 
 
 # ============================================
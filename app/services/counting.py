@@ -0,0 +1,61 @@
+"""
+Total de registros das listagens paginadas
+
+COUNT(*) sobre o filtro inteiro costuma custar mais que buscar a página.
+Modos (parâmetro `count`):
+
+- exact: COUNT(*) a cada chamada
+- approximate: estimativa do planejador do Postgres (EXPLAIN, que usa as
+  estatísticas de pg_class / pg_stats), sem ler a tabela. Estimativas abaixo
+  de COUNT_EXACT_BELOW são trocadas pela contagem exata, que nesse tamanho
+  é barata (e as estimativas de conjuntos pequenos são as mais imprecisas)
+- cached: COUNT(*) exato guardado por combinação de filtros, descartado na
+  próxima escrita (mesma versão de dados do cache do dashboard)
+"""
+import json
+from typing import Hashable, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.services.dashboard_cache import DashboardCache
+
+
+count_cache = DashboardCache(
+    max_keys=settings.COUNT_CACHE_MAX_KEYS,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS
+)
+
+
+def estimar(db: Session, query: Query) -> Optional[int]:
+    """Linhas estimadas pelo planejador para a consulta (None se não houver estatísticas)"""
+    sql = query.statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plano = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(sql)).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    linhas = plano[0]["Plan"]["Plan Rows"]
+
+    # Tabela nunca analisada: o planejador chuta um valor fixo
+    analisada = db.execute(text(
+        "SELECT reltuples >= 0 FROM pg_class WHERE oid = CAST(:tabela AS regclass)"
+    ), {"tabela": query.column_descriptions[0]["entity"].__tablename__}).scalar()
+    return int(linhas) if analisada else None
+
+
+def contar(db: Session, query: Query, modo: str, chave: Hashable) -> Tuple[int, str]:
+    """
+    Total da consulta no modo pedido
+
+    Retorna (total, modo usado): "approximate" vira "exact" quando a
+    estimativa é pequena ou não há estatísticas.
+    """
+    if modo == "cached":
+        return count_cache.get_or_compute(chave, query.count), "cached"
+
+    if modo == "approximate":
+        estimativa = estimar(db, query)
+        if estimativa is not None and estimativa >= settings.COUNT_EXACT_BELOW:
+            return estimativa, "approximate"
+
+    return query.count(), "exact"
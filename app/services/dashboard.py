@@ -0,0 +1,765 @@
+"""
+Consultas do dashboard
+
+`dashboard_stats` monta todas as métricas de /dashboard/stats com uma única
+consulta (uma ida ao banco), ou com três consultas independentes em paralelo
+(DASHBOARD_QUERY_WORKERS):
+
+- Um GROUP BY GROUPING SETS sobre os totais (mês, médico, tipo) do período
+  calcula, de uma vez, o total geral, o total por médico, por tipo e por mês
+- Top 5, série mensal e últimos procedimentos saem como json_agg na mesma
+  linha de resultado
+
+Os totais por (mês, médico, tipo) vêm do rollup mensal (procedimentos_mensal,
+ver app/services/rollup.py) para os meses inteiros do período; só os dias
+das pontas (meses incompletos) são lidos de procedimentos. Com
+DASHBOARD_ROLLUP=False tudo é lido de procedimentos.
+
+O período (data_inicio / data_fim, inclusivos) vale para todas as métricas
+de procedimentos. Os totais de cadastros (médicos, pacientes, tipos) não
+dependem do período.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+
+
+# GROUPING(medico_id, tipo_id, mes): bit ligado = coluna agregada
+NIVEL_TOTAL = 0b111
+NIVEL_MEDICO = 0b011
+NIVEL_TIPO = 0b101
+NIVEL_MES = 0b110
+
+# Totais por (mês, médico, tipo) lidos de procedimentos
+FONTE_PROCEDIMENTOS = """
+    SELECT date_trunc('month', data)::date AS mes, medico_id, tipo_id,
+           COUNT(*) AS total, COALESCE(SUM(valor), 0) AS valor
+    FROM procedimentos
+    WHERE {condicao}
+    GROUP BY 1, 2, 3
+"""
+
+# Mesmos totais, já agregados no rollup
+FONTE_ROLLUP = """
+    SELECT mes, medico_id, tipo_id, total, valor
+    FROM procedimentos_mensal
+    WHERE {condicao}
+"""
+
+# Partes independentes de /dashboard/stats (colunas do SELECT)
+STATS_CADASTROS = """
+    (SELECT COUNT(*) FROM medicos WHERE ativo) AS total_medicos,
+    (SELECT COUNT(*) FROM pacientes) AS total_pacientes,
+    (SELECT COUNT(*) FROM tipos_procedimento WHERE ativo) AS total_tipos
+"""
+
+STATS_AGREGADOS = """
+    geral.total AS total_procedimentos,
+    geral.mes_atual AS procedimentos_mes,
+    geral.valor AS valor_total,
+    (
+        SELECT json_agg(top ORDER BY top.total DESC, top.nome)
+        FROM (
+            SELECT a.medico_id AS id, m.nome, a.total
+            FROM agregado a JOIN medicos m ON m.id = a.medico_id
+            WHERE a.nivel = {nivel_medico}
+            ORDER BY a.total DESC, m.nome
+            LIMIT 5
+        ) top
+    ) AS top_medicos,
+    (
+        SELECT json_agg(top ORDER BY top.total DESC, top.nome)
+        FROM (
+            SELECT a.tipo_id AS id, t.nome, a.total
+            FROM agregado a JOIN tipos_procedimento t ON t.id = a.tipo_id
+            WHERE a.nivel = {nivel_tipo}
+            ORDER BY a.total DESC, t.nome
+            LIMIT 5
+        ) top
+    ) AS top_tipos,
+    (
+        SELECT json_agg(json_build_object('mes', a.mes, 'total', a.total) ORDER BY a.mes)
+        FROM agregado a
+        WHERE a.nivel = {nivel_mes} AND a.mes >= :serie_inicio
+    ) AS procedimentos_por_mes
+"""
+
+STATS_ULTIMOS = """
+    (
+        SELECT json_agg(ultimo ORDER BY ultimo.data DESC, ultimo.created_at DESC)
+        FROM (
+            SELECT p.id, p.data, p.created_at, t.nome AS tipo, m.nome AS medico,
+                   pa.nome AS paciente, p.valor
+            FROM procedimentos p
+            JOIN tipos_procedimento t ON t.id = p.tipo_id
+            JOIN medicos m ON m.id = p.medico_id
+            JOIN pacientes pa ON pa.id = p.paciente_id
+            WHERE {periodo_p}
+            ORDER BY p.data DESC, p.created_at DESC
+            LIMIT 10
+        ) ultimo
+    ) AS ultimos_procedimentos
+"""
+
+# Totais por (mês, médico, tipo) do período agregados de uma vez
+STATS_AGREGADO_CTE = """
+WITH fonte AS ({fonte}),
+agregado AS (
+    SELECT
+        medico_id,
+        tipo_id,
+        mes,
+        GROUPING(medico_id, tipo_id, mes) AS nivel,
+        COALESCE(SUM(total), 0) AS total,
+        COALESCE(SUM(valor), 0) AS valor,
+        COALESCE(SUM(total) FILTER (WHERE mes = :mes_atual), 0) AS mes_atual
+    FROM fonte
+    GROUP BY GROUPING SETS ((), (medico_id), (tipo_id), (mes))
+)
+"""
+
+STATS_GERAL = """
+FROM agregado geral
+WHERE geral.nivel = {nivel_total}
+"""
+
+# Uma consulta só (DASHBOARD_QUERY_WORKERS=0)
+STATS_SQL = (
+    STATS_AGREGADO_CTE
+    + "SELECT" + STATS_CADASTROS + "," + STATS_AGREGADOS + "," + STATS_ULTIMOS
+    + STATS_GERAL
+)
+
+# Ou três consultas independentes, em paralelo, cada uma em uma conexão
+STATS_PARTES_SQL = (
+    STATS_AGREGADO_CTE + "SELECT" + STATS_AGREGADOS + STATS_GERAL,
+    "SELECT" + STATS_CADASTROS,
+    "SELECT" + STATS_ULTIMOS,
+)
+
+
+def primeiro_dia_mes(dia: date, meses: int = 0) -> date:
+    """Primeiro dia do mês de `dia`, deslocado em `meses`"""
+    indice = dia.year * 12 + dia.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def periodo_sql(coluna: str, data_inicio: Optional[date], data_fim: Optional[date]) -> str:
+    """
+    Condição do período (só com os limites informados, para usar o índice de data)
+
+    Intervalo semiaberto: `coluna >= :data_inicio AND coluna < :data_limite`,
+    com data_limite = dia seguinte a data_fim (ver parametros_periodo).
+    """
+    condicoes = []
+    if data_inicio:
+        condicoes.append(f"{coluna} >= :data_inicio")
+    if data_fim:
+        condicoes.append(f"{coluna} < :data_limite")
+    return " AND ".join(condicoes) or "TRUE"
+
+
+def parametros_periodo(params: dict, data_inicio: Optional[date], data_fim: Optional[date]) -> dict:
+    """Acrescenta a `params` os limites usados por periodo_sql"""
+    if data_inicio:
+        params["data_inicio"] = data_inicio
+    if data_fim:
+        params["data_limite"] = data_fim + timedelta(days=1)
+    return params
+
+
+def dividir_periodo(data_inicio: Optional[date], data_fim: Optional[date]):
+    """
+    Separa o período em meses inteiros (rollup) e dias avulsos nas pontas
+
+    Retorna None se não houver mês inteiro no período, ou
+    (meses_inicio, meses_fim, pontas): meses em [meses_inicio, meses_fim)
+    (None = sem limite) e pontas como [(de, ate)) semiabertos.
+    """
+    meses_inicio = None
+    if data_inicio:
+        meses_inicio = data_inicio if data_inicio.day == 1 else primeiro_dia_mes(data_inicio, 1)
+    meses_fim = primeiro_dia_mes(data_fim + timedelta(days=1)) if data_fim else None
+
+    if meses_inicio and meses_fim and meses_inicio >= meses_fim:
+        return None
+
+    pontas: List[Tuple[date, date]] = []
+    if data_inicio and data_inicio < meses_inicio:
+        pontas.append((data_inicio, meses_inicio))
+    if data_fim and meses_fim <= data_fim:
+        pontas.append((meses_fim, data_fim + timedelta(days=1)))
+    return meses_inicio, meses_fim, pontas
+
+
+def fonte_mensal(data_inicio: Optional[date], data_fim: Optional[date], params: dict) -> str:
+    """
+    SQL com os totais (mes, medico_id, tipo_id, total, valor) do período
+
+    Usa o rollup para os meses inteiros (se DASHBOARD_ROLLUP) e
+    procedimentos para o resto. Acrescenta os parâmetros usados em `params`.
+    """
+    divisao = dividir_periodo(data_inicio, data_fim) if settings.DASHBOARD_ROLLUP else None
+    if divisao is None:
+        parametros_periodo(params, data_inicio, data_fim)
+        return FONTE_PROCEDIMENTOS.format(condicao=periodo_sql("data", data_inicio, data_fim))
+
+    meses_inicio, meses_fim, pontas = divisao
+    condicoes = []
+    if meses_inicio:
+        condicoes.append("mes >= :meses_inicio")
+        params["meses_inicio"] = meses_inicio
+    if meses_fim:
+        condicoes.append("mes < :meses_fim")
+        params["meses_fim"] = meses_fim
+    sql = FONTE_ROLLUP.format(condicao=" AND ".join(condicoes) or "TRUE")
+
+    if pontas:
+        intervalos = []
+        for i, (de, ate) in enumerate(pontas):
+            intervalos.append(f"(data >= :ponta{i}_de AND data < :ponta{i}_ate)")
+            params[f"ponta{i}_de"] = de
+            params[f"ponta{i}_ate"] = ate
+        sql += "    UNION ALL" + FONTE_PROCEDIMENTOS.format(condicao=" OR ".join(intervalos))
+    return sql
+
+
+# Pool de threads para as consultas paralelas (criado sob demanda)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DASHBOARD_QUERY_WORKERS, thread_name_prefix="dashboard"
+            )
+        return _executor
+
+
+def _consultar_linha(sql: str, params: dict) -> dict:
+    """Executa uma consulta de uma linha em uma sessão (conexão) própria"""
+    with SessionLocal() as db:
+        return dict(db.execute(text(sql), params).mappings().one())
+
+
+def consultar_em_paralelo(db: Session, consultas: List[str], params: dict) -> dict:
+    """
+    Executa consultas independentes de uma linha e junta as colunas
+
+    A primeira roda na sessão da requisição; as outras em paralelo, no pool
+    de DASHBOARD_QUERY_WORKERS threads, cada uma com uma conexão do pool do
+    banco. O pool de threads é compartilhado entre requisições, então no
+    máximo DASHBOARD_QUERY_WORKERS conexões extras ficam em uso ao mesmo tempo.
+    """
+    futures = [_get_executor().submit(_consultar_linha, sql, params) for sql in consultas[1:]]
+    row = dict(db.execute(text(consultas[0]), params).mappings().one())
+    for future in futures:
+        row.update(future.result())
+    return row
+
+
+def dashboard_stats(db: Session, data_inicio: Optional[date] = None,
+                    data_fim: Optional[date] = None) -> dict:
+    """
+    Estatísticas do dashboard em uma consulta (ou três em paralelo)
+
+    - totais, top 5 médicos/tipos e últimos 10 procedimentos: no período
+    - procedimentos_mes_atual: mês corrente, dentro do período
+    - procedimentos_por_mes: meses do período (sem data_inicio, os 6 meses
+      até data_fim, ou até hoje)
+
+    Com DASHBOARD_QUERY_WORKERS > 0, agregados, cadastros e últimos
+    procedimentos são consultados ao mesmo tempo em conexões separadas: o
+    tempo total fica próximo ao da consulta mais lenta (agregados).
+    """
+    hoje = date.today()
+    params = {
+        "mes_atual": primeiro_dia_mes(hoje),
+        "serie_inicio": primeiro_dia_mes(data_inicio) if data_inicio else primeiro_dia_mes(data_fim or hoje, -5),
+    }
+    parametros_periodo(params, data_inicio, data_fim)
+    trechos = {
+        "fonte": fonte_mensal(data_inicio, data_fim, params),
+        "periodo_p": periodo_sql("p.data", data_inicio, data_fim),
+        "nivel_total": NIVEL_TOTAL,
+        "nivel_medico": NIVEL_MEDICO,
+        "nivel_tipo": NIVEL_TIPO,
+        "nivel_mes": NIVEL_MES,
+    }
+
+    if settings.DASHBOARD_QUERY_WORKERS > 0:
+        row = consultar_em_paralelo(db, [sql.format(**trechos) for sql in STATS_PARTES_SQL], params)
+    else:
+        row = db.execute(text(STATS_SQL.format(**trechos)), params).mappings().one()
+
+    return {
+        "totais": {
+            "medicos": row["total_medicos"],
+            "pacientes": row["total_pacientes"],
+            "tipos_procedimento": row["total_tipos"],
+            "procedimentos": row["total_procedimentos"],
+            "procedimentos_mes_atual": row["procedimentos_mes"],
+            "valor_total": float(row["valor_total"])
+        },
+        "top_medicos": [
+            {
+                "id": m["id"],
+                "nome": m["nome"],
+                "total_procedimentos": m["total"]
+            }
+            for m in row["top_medicos"] or []
+        ],
+        "top_tipos": [
+            {
+                "id": t["id"],
+                "nome": t["nome"],
+                "total": t["total"]
+            }
+            for t in row["top_tipos"] or []
+        ],
+        "procedimentos_por_mes": [
+            {
+                "ano": int(p["mes"][:4]),
+                "mes": int(p["mes"][5:7]),
+                "total": p["total"]
+            }
+            for p in row["procedimentos_por_mes"] or []
+        ],
+        "ultimos_procedimentos": [
+            {
+                "id": p["id"],
+                "data": p["data"],
+                "tipo": p["tipo"],
+                "medico": p["medico"],
+                "paciente": p["paciente"],
+                "valor": float(p["valor"]) if p["valor"] else None
+            }
+            for p in row["ultimos_procedimentos"] or []
+        ]
+    }
+
+
+RELATORIO_SQL = """
+WITH fonte AS ({fonte})
+SELECT
+    t.nome AS tipo,
+    m.nome AS medico,
+    GROUPING(t.nome, m.nome) AS nivel,
+    COALESCE(SUM(f.total), 0) AS quantidade,
+    COALESCE(SUM(f.valor), 0) AS valor
+FROM fonte f
+JOIN tipos_procedimento t ON t.id = f.tipo_id
+JOIN medicos m ON m.id = f.medico_id
+GROUP BY GROUPING SETS ((), (t.nome), (m.nome))
+ORDER BY quantidade DESC, tipo, medico
+"""
+
+
+def relatorio_mensal(db: Session, ano: int, mes: int) -> dict:
+    """
+    Relatório de um mês: totais por tipo e por médico, agregados no banco
+
+    Retorna só as linhas agregadas (uma por tipo, uma por médico e o resumo);
+    o custo não cresce com o número de procedimentos do mês. Sem rollup, o mês
+    é lido de procedimentos pelo intervalo [1º dia, 1º dia do mês seguinte),
+    que usa o índice de data.
+    """
+    inicio = date(ano, mes, 1)
+    params = {}
+    sql = RELATORIO_SQL.format(fonte=fonte_mensal(inicio, primeiro_dia_mes(inicio, 1) - timedelta(days=1), params))
+
+    resumo = {"total_procedimentos": 0, "valor_total": 0.0}
+    por_tipo, por_medico = [], []
+    for row in db.execute(text(sql), params).mappings():
+        if row["nivel"] == 0b11:
+            resumo = {"total_procedimentos": row["quantidade"], "valor_total": float(row["valor"])}
+        elif row["nivel"] == 0b01:
+            por_tipo.append({"tipo": row["tipo"], "quantidade": row["quantidade"], "valor": float(row["valor"])})
+        else:
+            por_medico.append({"medico": row["medico"], "quantidade": row["quantidade"], "valor": float(row["valor"])})
+
+    return {
+        "periodo": {
+            "ano": ano,
+            "mes": mes
+        },
+        "resumo": resumo,
+        "por_tipo": por_tipo,
+        "por_medico": por_medico
+    }
+
+
+# ------------------------------------------
+# Série temporal (/dashboard/series)
+# ------------------------------------------
+
+# granularidade -> (intervalo entre pontos, período padrão em pontos)
+GRANULARIDADES = {
+    "day": ("1 day", 30),
+    "week": ("1 week", 12),
+    "month": ("1 month", 12),
+    "quarter": ("3 months", 8),
+}
+
+MAX_PONTOS_SERIE = 1000
+
+# Procedimentos um a um (para dia / semana)
+FONTE_DIARIA = """
+    SELECT data AS dia, medico_id, tipo_id, 1 AS total, COALESCE(valor, 0) AS valor
+    FROM procedimentos
+    WHERE {condicao}
+"""
+
+SERIE_SQL = """
+WITH fonte AS ({fonte}),
+pontos AS (
+    SELECT generate_series(
+        date_trunc(:granularidade, CAST(:data_inicio AS timestamp)),
+        CAST(:data_fim AS timestamp),
+        CAST(:passo AS interval)
+    )::date AS periodo
+),
+totais AS (
+    SELECT date_trunc(:granularidade, CAST({coluna} AS timestamp))::date AS periodo,
+           SUM(total) AS total, SUM(valor) AS valor
+    FROM fonte
+    WHERE {filtros}
+    GROUP BY 1
+)
+SELECT p.periodo, COALESCE(t.total, 0) AS total, COALESCE(t.valor, 0) AS valor
+FROM pontos p
+LEFT JOIN totais t ON t.periodo = p.periodo
+ORDER BY p.periodo
+"""
+
+
+def inicio_periodo(dia: date, granularidade: str) -> date:
+    """Início do ponto (dia / semana ISO / mês / trimestre) que contém `dia`"""
+    if granularidade == "week":
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == "month":
+        return primeiro_dia_mes(dia)
+    if granularidade == "quarter":
+        return date(dia.year, (dia.month - 1) // 3 * 3 + 1, 1)
+    return dia
+
+
+def contar_pontos(data_inicio: date, data_fim: date, granularidade: str) -> int:
+    """Quantidade de pontos da série entre as duas datas"""
+    inicio = inicio_periodo(data_inicio, granularidade)
+    if granularidade == "day":
+        return (data_fim - inicio).days + 1
+    if granularidade == "week":
+        return (data_fim - inicio).days // 7 + 1
+    meses = (data_fim.year - inicio.year) * 12 + data_fim.month - inicio.month
+    return meses // (3 if granularidade == "quarter" else 1) + 1
+
+
+def periodo_padrao_serie(granularidade: str, data_fim: date) -> date:
+    """data_inicio padrão: os últimos N pontos até data_fim (ver GRANULARIDADES)"""
+    fim = inicio_periodo(data_fim, granularidade)
+    pontos = GRANULARIDADES[granularidade][1] - 1
+    if granularidade == "day":
+        return fim - timedelta(days=pontos)
+    if granularidade == "week":
+        return fim - timedelta(weeks=pontos)
+    return primeiro_dia_mes(fim, -pontos * (3 if granularidade == "quarter" else 1))
+
+
+def serie_temporal(db: Session, granularidade: str, data_inicio: date, data_fim: date,
+                   medico_id=None, tipo_id=None) -> dict:
+    """
+    Totais de procedimentos por dia / semana / mês / trimestre
+
+    Os pontos saem de generate_series, então períodos sem procedimentos vêm
+    com zero. Mês e trimestre somam o rollup mensal (fonte_mensal); dia e
+    semana leem procedimentos. O primeiro ponto começa no início do período
+    que contém data_inicio, mas só conta procedimentos a partir dela.
+    """
+    passo = GRANULARIDADES[granularidade][0]
+    params = {"granularidade": granularidade, "passo": passo}
+
+    if granularidade in ("month", "quarter"):
+        fonte, coluna = fonte_mensal(data_inicio, data_fim, params), "mes"
+    else:
+        parametros_periodo(params, data_inicio, data_fim)
+        fonte, coluna = FONTE_DIARIA.format(condicao=periodo_sql("data", data_inicio, data_fim)), "dia"
+
+    # Limites de generate_series (fonte_mensal não usa data_inicio / data_fim)
+    params["data_inicio"] = data_inicio
+    params["data_fim"] = data_fim
+
+    filtros = []
+    if medico_id:
+        filtros.append("medico_id = :medico_id")
+        params["medico_id"] = medico_id
+    if tipo_id:
+        filtros.append("tipo_id = :tipo_id")
+        params["tipo_id"] = tipo_id
+
+    sql = SERIE_SQL.format(fonte=fonte, coluna=coluna, filtros=" AND ".join(filtros) or "TRUE")
+
+    return {
+        "granularidade": granularidade,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "medico_id": medico_id,
+        "tipo_id": tipo_id,
+        "pontos": [
+            {
+                "periodo": row["periodo"],
+                "total": row["total"],
+                "valor": float(row["valor"])
+            }
+            for row in db.execute(text(sql), params).mappings()
+        ]
+    }
+
+
+# ------------------------------------------
+# Cubo (/dashboard/cube)
+# ------------------------------------------
+
+class DimensaoCubo(NamedTuple):
+    coluna: str  # Expressão no SELECT
+    chave: Tuple[str, ...]  # Expressões agrupadas (id + nome: homônimos não se misturam)
+    join: Optional[str] = None
+
+
+DIMENSOES_CUBO = {
+    "medico": DimensaoCubo("m.nome", ("f.medico_id", "m.nome"), "JOIN medicos m ON m.id = f.medico_id"),
+    "tipo": DimensaoCubo("t.nome", ("f.tipo_id", "t.nome"), "JOIN tipos_procedimento t ON t.id = f.tipo_id"),
+    "paciente": DimensaoCubo("pa.nome", ("f.paciente_id", "pa.nome"), "JOIN pacientes pa ON pa.id = f.paciente_id"),
+    "mes": DimensaoCubo("to_char(f.mes, 'YYYY-MM')", ("f.mes",)),
+    "ano": DimensaoCubo("CAST(EXTRACT(YEAR FROM f.mes) AS integer)", ("EXTRACT(YEAR FROM f.mes)",)),
+}
+
+# medida -> expressão
+MEDIDAS_CUBO = {
+    "count": "SUM(f.total)",
+    "sum": "SUM(f.valor)",
+    "avg": "ROUND(SUM(f.valor) / NULLIF(SUM(f.total), 0), 2)",
+}
+
+# subtotais -> agrupamento
+SUBTOTAIS_CUBO = {
+    "none": "GROUPING SETS (({}))",
+    "rollup": "ROLLUP ({})",
+    "cube": "CUBE ({})",
+}
+
+MAX_LINHAS_CUBO = 50000
+
+# Totais por (mês, médico, tipo, paciente): o rollup não tem paciente
+FONTE_PACIENTE = """
+    SELECT date_trunc('month', data)::date AS mes, medico_id, tipo_id, paciente_id,
+           COUNT(*) AS total, COALESCE(SUM(valor), 0) AS valor
+    FROM procedimentos
+    WHERE {condicao}
+    GROUP BY 1, 2, 3, 4
+"""
+
+CUBO_SQL = """
+WITH fonte AS ({fonte})
+SELECT {colunas},
+       GROUPING({grouping}) AS nivel,
+       {medidas}
+FROM fonte f
+{joins}
+GROUP BY {agrupamento}
+ORDER BY nivel, {ordem}
+LIMIT :limite
+"""
+
+
+class CuboMuitoGrande(Exception):
+    """O cubo pedido passa de MAX_LINHAS_CUBO linhas"""
+
+
+def cubo(db: Session, dimensoes: List[str], medidas: List[str], subtotais: str = "rollup",
+         data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> dict:
+    """
+    Tabela dinâmica (dimensões x medidas) em uma consulta GROUPING SETS
+
+    - subtotais="none": só as combinações completas das dimensões
+    - "rollup": + subtotais hierárquicos na ordem das dimensões e total geral
+    - "cube": + subtotais de todas as combinações de dimensões
+
+    Resposta colunar: cada coluna é uma lista, todas do mesmo tamanho. Em
+    linhas de subtotal a dimensão agregada vem null e `nivel` indica quais
+    foram agregadas (bit ligado = agregada; a primeira dimensão é o bit mais
+    alto). "avg" é o valor médio por procedimento (sem valor conta como 0).
+    """
+    params = {"limite": MAX_LINHAS_CUBO + 1}
+    if "paciente" in dimensoes:
+        parametros_periodo(params, data_inicio, data_fim)
+        fonte = FONTE_PACIENTE.format(condicao=periodo_sql("data", data_inicio, data_fim))
+    else:
+        fonte = fonte_mensal(data_inicio, data_fim, params)
+
+    definicoes = [DIMENSOES_CUBO[d] for d in dimensoes]
+    if subtotais == "none":
+        chaves = ", ".join(c for d in definicoes for c in d.chave)
+    else:
+        # Cada dimensão é uma unidade no ROLLUP / CUBE
+        chaves = ", ".join(f"({', '.join(d.chave)})" for d in definicoes)
+
+    sql = CUBO_SQL.format(
+        fonte=fonte,
+        colunas=", ".join(f"{d.coluna} AS {nome}" for nome, d in zip(dimensoes, definicoes)),
+        grouping=", ".join(d.chave[-1] for d in definicoes),
+        medidas=", ".join(f"{MEDIDAS_CUBO[m]} AS {m}" for m in medidas),
+        joins="\n".join(d.join for d in definicoes if d.join),
+        agrupamento=SUBTOTAIS_CUBO[subtotais].format(chaves),
+        ordem=", ".join(str(i) for i in range(1, len(dimensoes) + 1)),
+    )
+
+    rows = db.execute(text(sql), params).all()
+    if len(rows) > MAX_LINHAS_CUBO:
+        raise CuboMuitoGrande(f"O cubo tem mais de {MAX_LINHAS_CUBO} linhas; use menos dimensões ou um período menor")
+
+    nomes = dimensoes + ["nivel"] + medidas
+    colunas = {nome: list(valores) for nome, valores in zip(nomes, zip(*rows))} if rows else {nome: [] for nome in nomes}
+    for m in medidas:
+        if m != "count":
+            colunas[m] = [float(v) if v is not None else None for v in colunas[m]]
+
+    return {
+        "dimensoes": dimensoes,
+        "medidas": medidas,
+        "subtotais": subtotais,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "linhas": len(rows),
+        "colunas": colunas
+    }
+
+
+# ------------------------------------------
+# Distribuição dos valores (/dashboard/valores)
+# ------------------------------------------
+
+# agrupamento -> (coluna de procedimentos, tabela com o nome)
+AGRUPAMENTOS_VALORES = {
+    "geral": (None, None),
+    "tipo": ("p.tipo_id", "tipos_procedimento"),
+    "medico": ("p.medico_id", "medicos"),
+}
+
+PERCENTIS = (0.5, 0.9, 0.99)
+
+VALORES_SQL = """
+WITH amostra AS (
+    SELECT {grupo} AS grupo_id, p.valor
+    FROM procedimentos p {tablesample}
+    WHERE p.valor IS NOT NULL AND {periodo}
+),
+estatisticas AS (
+    SELECT
+        grupo_id,
+        COUNT(*) AS quantidade,
+        MIN(valor) AS minimo,
+        MAX(valor) AS maximo,
+        AVG(valor) AS media,
+        STDDEV_SAMP(valor) AS desvio_padrao,
+        percentile_cont(CAST(:percentis AS double precision[])) WITHIN GROUP (ORDER BY valor) AS percentis
+    FROM amostra
+    GROUP BY grupo_id
+),
+histograma AS (
+    SELECT
+        a.grupo_id,
+        CASE WHEN e.maximo = e.minimo THEN 1
+             ELSE LEAST(width_bucket(a.valor, e.minimo, e.maximo, :faixas), :faixas)
+        END AS faixa,
+        COUNT(*) AS total
+    FROM amostra a
+    JOIN estatisticas e ON e.grupo_id IS NOT DISTINCT FROM a.grupo_id
+    GROUP BY 1, 2
+)
+SELECT
+    e.*,
+    {nome} AS nome,
+    (
+        SELECT json_object_agg(h.faixa, h.total)
+        FROM histograma h
+        WHERE h.grupo_id IS NOT DISTINCT FROM e.grupo_id
+    ) AS histograma
+FROM estatisticas e
+{join}
+ORDER BY e.quantidade DESC, nome
+"""
+
+
+def distribuicao_valores(db: Session, agrupar_por: str = "tipo", data_inicio: Optional[date] = None,
+                         data_fim: Optional[date] = None, faixas: int = 10,
+                         amostra: Optional[float] = None) -> dict:
+    """
+    Percentis, mínimo/máximo, média, desvio padrão e histograma do valor
+
+    Tudo calculado no banco (percentile_cont / width_bucket), por tipo, por
+    médico ou geral. Procedimentos sem valor são ignorados. O histograma tem
+    `faixas` intervalos iguais entre o mínimo e o máximo de cada grupo.
+
+    Com `amostra` (porcentagem, 0-100], lê só parte das páginas da tabela
+    (TABLESAMPLE SYSTEM): resultados aproximados, tempo proporcional à amostra.
+    """
+    coluna, tabela = AGRUPAMENTOS_VALORES[agrupar_por]
+    params = parametros_periodo({"percentis": list(PERCENTIS), "faixas": faixas}, data_inicio, data_fim)
+
+    tablesample = ""
+    if amostra is not None and amostra < 100:
+        # REPEATABLE: mesma amostra enquanto a tabela não mudar
+        tablesample = "TABLESAMPLE SYSTEM (:amostra) REPEATABLE (0)"
+        params["amostra"] = amostra
+
+    sql = VALORES_SQL.format(
+        grupo=coluna or "CAST(NULL AS uuid)",
+        tablesample=tablesample,
+        periodo=periodo_sql("p.data", data_inicio, data_fim),
+        nome="g.nome" if tabela else "NULL",
+        join=f"JOIN {tabela} g ON g.id = e.grupo_id" if tabela else "",
+    )
+
+    grupos = []
+    for row in db.execute(text(sql), params).mappings():
+        minimo, maximo = float(row["minimo"]), float(row["maximo"])
+        largura = (maximo - minimo) / faixas
+        contagem = row["histograma"] or {}
+        grupos.append({
+            "id": row["grupo_id"],
+            "nome": row["nome"],
+            "quantidade": row["quantidade"],
+            "minimo": minimo,
+            "maximo": maximo,
+            "media": round(float(row["media"]), 2),
+            "desvio_padrao": round(float(row["desvio_padrao"]), 2) if row["desvio_padrao"] is not None else None,
+            **{f"p{round(p * 100)}": round(v, 2) for p, v in zip(PERCENTIS, row["percentis"])},
+            "histograma": [
+                {
+                    "de": round(minimo + i * largura, 2),
+                    "ate": round(minimo + (i + 1) * largura, 2),
+                    "total": contagem.get(str(i + 1), 0)
+                }
+                for i in range(faixas)
+            ]
+        })
+
+    return {
+        "agrupar_por": agrupar_por,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "amostra": amostra,
+        "faixas": faixas,
+        "grupos": grupos
+    }
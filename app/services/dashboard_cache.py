@@ -0,0 +1,148 @@
+"""
+Cache das respostas do dashboard (/dashboard/stats, /relatorio-mensal, /series, ...)
+
+O dashboard fica aberto e é atualizado o tempo todo, mas os dados só mudam
+com imports e edições. Cada resposta fica guardada em memória, pela chave
+(endpoint, parâmetros normalizados), junto com a versão dos dados
+(app/services/data_version.py) com que foi calculada:
+
+- Qualquer commit em procedimentos, médicos, pacientes ou tipos incrementa
+  a versão e as respostas guardadas deixam de valer
+- TTL (DASHBOARD_CACHE_TTL_SECONDS) limita o tempo de vida mesmo sem
+  escritas (ex: SQL manual, outro processo)
+- LRU limita a quantidade de respostas (DASHBOARD_CACHE_MAX_KEYS)
+
+DASHBOARD_CACHE_TTL_SECONDS=0 desliga o cache.
+
+Requisições simultâneas com a mesma chave (ex: todos os dashboards abertos
+atualizando ao fim de um import) compartilham um único cálculo em andamento
+(single-flight): a primeira consulta o banco, as outras esperam e recebem
+o mesmo resultado. Vale também com o cache desligado.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.core.config import settings
+from app.services import data_version
+
+
+class _Chamada:
+    """Cálculo em andamento, compartilhado por quem pedir a mesma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Executa no máximo um cálculo por chave de cada vez"""
+
+    def __init__(self):
+        self.coalesced = 0  # Requisições atendidas pelo cálculo de outra
+        self._calls: Dict[Hashable, _Chamada] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Chamada()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class DashboardCache:
+    """Mapa chave -> resposta com TTL, LRU e versão dos dados"""
+
+    def __init__(self, max_keys: int, ttl: int):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires_at, versao, value = item
+                if expires_at >= time.monotonic() and versao == data_version.atual():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, versao: int) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, versao, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Resposta guardada para `key`, ou calcula (uma vez só), guarda e retorna"""
+        # Versão lida antes de calcular: se houver escrita durante o cálculo,
+        # o resultado já nasce vencido (e quem chegar depois não espera por ele)
+        versao = data_version.atual()
+        if self.ttl <= 0:
+            return self._flight.do((key, versao), compute)
+
+        value = self.get(key)
+        if value is None:
+            value = self._flight.do((key, versao), lambda: self._compute_and_set(key, compute, versao))
+        return value
+
+    def _compute_and_set(self, key: Hashable, compute: Callable[[], Any], versao: int) -> Any:
+        value = compute()
+        self.set(key, value, versao)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "coalesced": self._flight.coalesced,
+                "keys": len(self._items),
+                "max_keys": self.max_keys,
+                "ttl_seconds": self.ttl,
+                "data_version": data_version.atual()
+            }
+
+
+dashboard_cache = DashboardCache(
+    max_keys=settings.DASHBOARD_CACHE_MAX_KEYS,
+    ttl=settings.DASHBOARD_CACHE_TTL_SECONDS
+)
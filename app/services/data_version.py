@@ -0,0 +1,82 @@
+"""
+Versão dos dados (contador de escritas)
+
+Contador em memória incrementado a cada commit que alterou procedimentos,
+médicos, pacientes ou tipos de procedimento. Caches de leitura (ex: o do
+dashboard) guardam a versão com que calcularam o resultado e o descartam
+quando ela muda.
+
+As escritas são detectadas na própria sessão (SessionLocal):
+- ORM (db.add / alteração / db.delete): evento after_flush
+- INSERT/UPDATE/DELETE em massa via db.execute (ex: ImportEngine): evento
+  do_orm_execute
+
+A versão só muda no commit da transação principal; escritas desfeitas
+(rollback) não invalidam nada.
+
+O contador é por processo: com vários workers (uvicorn --workers N) cada
+um tem a sua versão, e só enxerga as escritas feitas por ele.
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.procedimento import Procedimento
+from app.models.tipo_procedimento import TipoProcedimento
+
+
+MODELOS = (Procedimento, Medico, Paciente, TipoProcedimento)
+TABELAS = frozenset(model.__tablename__ for model in MODELOS)
+
+# Chave em session.info: a transação atual alterou dados monitorados
+_ALTERADO = "data_version_alterado"
+
+_versao = 0
+_lock = threading.Lock()
+
+
+def atual() -> int:
+    """Versão atual dos dados"""
+    return _versao
+
+
+def incrementar() -> int:
+    """Marca que os dados mudaram (invalida caches). Retorna a nova versão"""
+    global _versao
+    with _lock:
+        _versao += 1
+        return _versao
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _marcar_flush(session: Session, flush_context) -> None:
+    for objs in (session.new, session.dirty, session.deleted):
+        if any(isinstance(obj, MODELOS) for obj in objs):
+            session.info[_ALTERADO] = True
+            return
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _marcar_execute(orm_execute_state) -> None:
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    tabela = getattr(orm_execute_state.statement, "table", None)
+    if getattr(tabela, "name", None) in TABELAS:
+        orm_execute_state.session.info[_ALTERADO] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _incrementar_no_commit(session: Session) -> None:
+    # Commit de savepoint não conta: só o da transação principal
+    if not session.in_nested_transaction() and session.info.pop(_ALTERADO, False):
+        incrementar()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_no_rollback(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(_ALTERADO, None)
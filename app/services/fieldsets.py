@@ -0,0 +1,115 @@
+"""
+Campos das respostas das listagens (parâmetro `fields`)
+
+`fields=data,tipo.nome,valor` devolve só esses campos e vira um SELECT só
+das colunas correspondentes, com JOIN apenas nas tabelas necessárias
+(tipo.id, medico.id e paciente.id vêm da própria FK em procedimentos, sem
+JOIN). Um grupo sozinho (`tipo`) pede todos os campos dele.
+
+Sem `fields`, todos os campos (formato de sempre da listagem). Em qualquer
+caso as linhas vêm como tuplas, sem montar objetos do ORM.
+"""
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.procedimento import Procedimento
+from app.models.tipo_procedimento import TipoProcedimento
+
+
+class InvalidFields(ValueError):
+    """Campo pedido não existe na listagem"""
+
+
+def _decimal(valor) -> Optional[float]:
+    return float(valor) if valor else None
+
+
+def _data(valor) -> Optional[str]:
+    return valor.isoformat() if valor else None
+
+
+def _texto(valor):
+    return valor
+
+
+class Campo(NamedTuple):
+    coluna: Any
+    join: Any = None  # Relacionamento a juntar (None = coluna da tabela principal)
+    formato: Callable = _texto
+
+
+# Na ordem da resposta; "grupo.campo" vira {"grupo": {"campo": ...}}
+PROCEDIMENTO: Dict[str, Campo] = {
+    "id": Campo(Procedimento.id, formato=str),
+    "data": Campo(Procedimento.data, formato=_data),
+    "tipo.id": Campo(Procedimento.tipo_id, formato=str),
+    "tipo.nome": Campo(TipoProcedimento.nome, Procedimento.tipo),
+    "tipo.valor_referencia": Campo(TipoProcedimento.valor_referencia, Procedimento.tipo, _decimal),
+    "medico.id": Campo(Procedimento.medico_id, formato=str),
+    "medico.nome": Campo(Medico.nome, Procedimento.medico),
+    "medico.crm": Campo(Medico.crm, Procedimento.medico),
+    "paciente.id": Campo(Procedimento.paciente_id, formato=str),
+    "paciente.nome": Campo(Paciente.nome, Procedimento.paciente),
+    "valor": Campo(Procedimento.valor, formato=_decimal),
+    "observacoes": Campo(Procedimento.observacoes),
+}
+
+MEDICO: Dict[str, Campo] = {
+    "id": Campo(Medico.id, formato=str),
+    "nome": Campo(Medico.nome),
+    "crm": Campo(Medico.crm),
+    "especialidade": Campo(Medico.especialidade),
+}
+
+PACIENTE: Dict[str, Campo] = {
+    "id": Campo(Paciente.id, formato=str),
+    "nome": Campo(Paciente.nome),
+    "cpf": Campo(Paciente.cpf),
+}
+
+
+def selecionar(fields: Optional[str], campos: Dict[str, Campo]) -> List[str]:
+    """Campos pedidos em `fields` (separados por vírgula), na ordem da resposta"""
+    if not fields:
+        return list(campos)
+
+    pedidos = set()
+    for pedido in (item.strip() for item in fields.split(",")):
+        if not pedido:
+            continue
+        nomes = [nome for nome in campos if nome == pedido or nome.startswith(pedido + ".")]
+        if not nomes:
+            raise InvalidFields(f"Campo inválido: {pedido}. Use: {', '.join(campos)}")
+        pedidos.update(nomes)
+
+    if not pedidos:
+        raise InvalidFields(f"Informe ao menos um campo entre: {', '.join(campos)}")
+    return [nome for nome in campos if nome in pedidos]
+
+
+def projetar(query, campos: Dict[str, Campo], selecionados: List[str], extras: Iterable[str] = ()):
+    """
+    Troca as entidades da consulta pelas colunas dos campos selecionados
+
+    `extras` entram no SELECT sem ir para a resposta (ex: data e id para o
+    cursor). Filtros e ordenação da consulta original são mantidos.
+    """
+    nomes = list(dict.fromkeys([*selecionados, *extras]))
+    query = query.with_entities(*(campos[nome].coluna.label(nome) for nome in nomes))
+    for join in dict.fromkeys(campos[nome].join for nome in nomes if campos[nome].join is not None):
+        query = query.join(join)
+    return query
+
+
+def montar(linha, campos: Dict[str, Campo], selecionados: List[str]) -> dict:
+    """Item da resposta a partir de uma linha de projetar()"""
+    item: dict = {}
+    valores = linha._mapping
+    for nome in selecionados:
+        *grupos, chave = nome.split(".")
+        destino = item
+        for grupo in grupos:
+            destino = destino.setdefault(grupo, {})
+        destino[chave] = campos[nome].formato(valores[nome])
+    return item
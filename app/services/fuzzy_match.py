@@ -0,0 +1,106 @@
+"""
+Matching aproximado de nomes
+
+Índice construído uma vez por importação, em duas etapas:
+
+1. Blocking: cada nome é indexado pelas chaves "nome completo", "nome sem
+   a palavra i" e "nome com a palavra i reduzida às 3 primeiras letras"
+   (para cada palavra). Um erro de digitação, uma abreviação ("dr" / "dr.")
+   ou uma palavra a mais/a menos mantém pelo menos uma chave em comum.
+2. Verificação: os candidatos dos blocos são comparados por similaridade de
+   Jaccard dos trigramas (como o pg_trgm) e o melhor acima do limite vence.
+
+Blocos com mais de `max_block` nomes (ex: "maria" sozinho, quando muitos
+nomes têm duas palavras e o mesmo prenome) não distinguem nada e são
+ignorados na busca: cada consulta compara no máximo
+len(blocking_keys) x max_block candidatos, independente do tamanho da
+tabela. Nesses casos as chaves com prefixo ("maria sil") ainda costumam
+achar o cadastro; se nenhuma chave útil sobrar, o nome vira cadastro novo.
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+PREFIX_SIZE = 3  # Letras mantidas na chave com uma palavra abreviada
+
+
+def trigrams(key: str) -> FrozenSet[str]:
+    """Trigramas de um nome já normalizado (com padding, como o pg_trgm)"""
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def blocking_keys(key: str) -> Set[str]:
+    """Nome completo + variações sem uma das palavras ou com ela abreviada"""
+    tokens = key.split()
+    keys = {key}
+    if len(tokens) > 1:
+        for i, token in enumerate(tokens):
+            keys.add(" ".join(tokens[:i] + tokens[i + 1:]))
+            if len(token) > PREFIX_SIZE:
+                keys.add(" ".join(tokens[:i] + [token[:PREFIX_SIZE]] + tokens[i + 1:]))
+    return keys
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similaridade de Jaccard entre dois conjuntos de trigramas"""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class NameMatcher:
+    """
+    Índice de nomes normalizados para busca por similaridade
+
+    Uso:
+        matcher = NameMatcher(["dr. joao silva"], threshold=0.75)
+        matcher.match("dr. joao silvaa")  # -> ("dr. joao silva", 0.82)
+        matcher.add("dr. pedro alvares")
+    """
+
+    def __init__(self, keys: Iterable[str], threshold: float, max_block: int = 200):
+        self.threshold = threshold
+        self.max_block = max_block
+        self._keys: List[str] = []
+        # Bloco -> posições; None = bloco saturado (mais de max_block nomes)
+        self._blocks: Dict[str, Optional[List[int]]] = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str) -> None:
+        """Adiciona um nome (normalizado) ao índice"""
+        position = len(self._keys)
+        self._keys.append(key)
+        for block in blocking_keys(key):
+            positions = self._blocks.setdefault(block, [])
+            if positions is None:
+                continue
+            if len(positions) >= self.max_block:
+                self._blocks[block] = None  # Saturado: não é mais consultado
+            else:
+                positions.append(position)
+
+    def candidates(self, key: str) -> Set[int]:
+        """Posições a comparar com `key` (no máximo len(blocking_keys) x max_block)"""
+        candidatos = set()
+        for block in blocking_keys(key):
+            candidatos.update(self._blocks.get(block) or ())
+        return candidatos
+
+    def match(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Nome mais parecido com similaridade >= threshold
+
+        Retorna (nome, similaridade) ou None
+        """
+        grams = trigrams(key)
+        melhor = None
+        for position in self.candidates(key):
+            other = self._keys[position]
+            score = similarity(grams, trigrams(other))
+            if score >= self.threshold and (melhor is None or score > melhor[1]):
+                melhor = (other, score)
+
+        return melhor
@@ -0,0 +1,49 @@
+"""
+Cache de resultados por Idempotency-Key
+
+Se o cliente repetir uma requisição com a mesma chave (ex: retry após
+timeout), devolvemos o resultado guardado em vez de rodar o import de novo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+
+
+class IdempotencyCache:
+    """Mapa chave -> resultado com TTL e limite de tamanho (LRU)"""
+
+    def __init__(self, max_keys: int, ttl: int):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+
+
+import_results = IdempotencyCache(
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS
+)
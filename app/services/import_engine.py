@@ -0,0 +1,728 @@
+"""
+Engine de importação em lote (set-based)
+
+Em vez de buscar/criar médico, paciente e tipo linha a linha, o engine
+coleta os nomes distintos do lote, resolve cada tabela com uma consulta,
+cria os que faltam com um único INSERT ... RETURNING e grava os
+procedimentos com INSERT em lotes (executemany).
+
+Nomes que não existem exatamente passam pelo matching aproximado
+(app/services/fuzzy_match.py): se houver um cadastro parecido acima de
+IMPORT_FUZZY_THRESHOLD, a linha é associada a ele e a junção vira aviso.
+
+Médicos e pacientes podem ter homônimos (cadastros com o mesmo nome e
+CRM / CPF diferentes). A planilha só traz o nome, então ele é resolvido para
+o cadastro sem documento com esse nome (chave única, ver DOCUMENTOS) ou, se
+não houver, para o único cadastro com esse nome. Havendo vários, nenhum é
+escolhido: é criado um cadastro sem documento e a ambiguidade vira aviso.
+
+Cada procedimento importado recebe um fingerprint (hash da data e dos nomes
+normalizados); o INSERT usa ON CONFLICT DO NOTHING, então reimportar a mesma
+planilha não duplica registros.
+
+`preview` faz o mesmo caminho (datas, campos obrigatórios, resolução de
+entidades e duplicatas) sem escrever no banco, para o modo dry_run.
+"""
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.text import normalize_name
+from app.services import ranking, rollup
+from app.services.fuzzy_match import NameMatcher
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.tipo_procedimento import TipoProcedimento
+from app.models.procedimento import Procedimento
+from app.models.import_checkpoint import ImportCheckpoint
+from app.schemas.import_schema import ImportResult, ImportRow
+from app.services.import_files import batched
+from app.services.import_preprocess import PreparedBatch, RowPreprocessor
+
+
+def row_fingerprint(data: date, tipo: str, medico: str, paciente: str) -> str:
+    """Hash determinístico de uma linha importada (data + nomes normalizados)"""
+    key = "|".join([
+        data.isoformat(),
+        normalize_name(tipo),
+        normalize_name(medico),
+        normalize_name(paciente),
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def chunks(items: Sequence, size: int):
+    """Divide uma sequência em fatias de no máximo `size` itens"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Valores usados ao criar entidades automaticamente
+DEFAULTS_MEDICO = {
+    "crm": None,  # Será preenchido manualmente depois
+    "especialidade": "A definir",
+    "ativo": True,
+}
+
+DEFAULTS_PACIENTE = {
+    "cpf": None,
+    "data_nascimento": None,
+}
+
+DEFAULTS_TIPO = {
+    "descricao": "Criado automaticamente via importação",
+    "valor_referencia": 0.00,
+    "ativo": True,
+}
+
+
+# Documento de cada cadastro de pessoa: o nome só é único entre os registros
+# sem documento (índice parcial ix_<tabela>_nome_normalizado_sem_<doc>)
+DOCUMENTOS = {
+    Medico: Medico.crm,
+    Paciente: Paciente.cpf,
+}
+
+
+# Máximo de junções aproximadas listadas nos avisos
+FUZZY_WARNINGS_MAX = 20
+
+
+class ImportEngine:
+    """
+    Importa linhas de procedimentos em lote
+
+    Uso:
+        engine = ImportEngine(db)
+        engine.execute(rows)  # grava (commit) ao final
+        result = engine.result()
+
+    Com `chunk_size`, `execute` grava a cada N linhas (ver run_chunked).
+    `run` consome os lotes sob demanda (ex: um arquivo lido em partes); os
+    nomes já resolvidos ficam em cache e não são consultados de novo.
+    """
+
+    def __init__(self, db: Session, batch_size: Optional[int] = None,
+                 fuzzy_threshold: Optional[float] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        if fuzzy_threshold is None:
+            fuzzy_threshold = settings.IMPORT_FUZZY_THRESHOLD if settings.IMPORT_FUZZY_MATCH else 0
+        self.fuzzy_threshold = fuzzy_threshold
+        self.preprocessor = RowPreprocessor(
+            workers=settings.IMPORT_PREPROCESS_WORKERS,
+            min_rows=settings.IMPORT_PREPROCESS_MIN_ROWS
+        )
+
+        self.errors: List[dict] = []
+        self.success = 0
+        self.duplicates = 0
+        self.rows_processed = 0
+
+        # Cache: nome normalizado -> (chave canônica, id, ...) do banco
+        self._medicos: Dict[str, tuple] = {}
+        self._pacientes: Dict[str, tuple] = {}
+        self._tipos: Dict[str, tuple] = {}
+
+        # Índices de matching aproximado (construídos sob demanda, 1x por import)
+        self._matchers: Dict[type, NameMatcher] = {}
+        self.merges: List[str] = []  # Junções aproximadas realizadas
+
+        # Nomes com vários cadastros documentados: (model, chave) -> quantidade
+        self._homonimos: Dict[Tuple[type, str], int] = {}
+        self.homonyms: List[str] = []  # Avisos de homônimos
+
+        # Chaves adicionadas aos caches no lote atual (desfeitas se o lote falhar)
+        self._journal: List[Tuple[Dict[str, tuple], str]] = []
+
+        # Partes desfeitas no modo em partes: (primeira linha, última linha)
+        self.failed: List[Tuple[int, int]] = []
+
+        # Contadores de entidades criadas
+        self.created = {"medicos": 0, "pacientes": 0, "tiposProcedimento": 0}
+
+        # Dry run: resolução prevista por nome e fingerprints já vistos no arquivo
+        self._previews: Dict[type, Dict[str, dict]] = {}
+        self._fingerprints = set()
+
+    # ------------------------------------------
+    # Resolução de entidades
+    # ------------------------------------------
+
+    def _resolve(self, model, cache: Dict[str, tuple], nomes: Dict[str, str],
+                 defaults: dict, columns: tuple, label: Optional[str] = None) -> int:
+        """
+        Resolve nomes -> linhas do banco para uma tabela
+
+        - Uma consulta (por fatia de batch_size nomes) busca os existentes
+          pelo índice de nome_normalizado (homônimos: ver _fetch)
+        - Se `label` for informado e o matching aproximado estiver ativo,
+          nomes sem correspondência exata são associados ao cadastro mais
+          parecido (inclusive a nomes novos do próprio lote)
+        - Um INSERT ... ON CONFLICT DO NOTHING RETURNING cria os que faltam
+
+        Retorna quantos registros foram criados
+        """
+        faltando = [key for key in nomes if key not in cache]
+        if not faltando:
+            return 0
+
+        # Buscar existentes
+        self._fetch(model, cache, faltando, columns)
+        novos = [key for key in faltando if key not in cache]
+
+        # Matching aproximado
+        aliases = {}
+        if label and novos and 0 < self.fuzzy_threshold < 1:
+            matcher = self._matcher(model)
+            restantes = []
+            for key in novos:
+                if (model, key) in self._homonimos:
+                    restantes.append(key)  # Nome existe, mas é ambíguo
+                    continue
+                match = matcher.match(key)
+                if match:
+                    aliases[key] = match
+                else:
+                    restantes.append(key)
+                    matcher.add(key)
+            novos = restantes
+
+        # Cadastros escolhidos pelo matching: carregar antes do INSERT. Se o
+        # nome escolhido for de homônimos ambíguos (ou sumiu nesse meio
+        # tempo), a chave vira um nome novo
+        documento = DOCUMENTOS.get(model)
+        lote = set(novos)
+        pendentes = [canonical for canonical, _ in aliases.values()
+                     if canonical not in cache and canonical not in lote]
+        if pendentes:
+            self._fetch(model, cache, list(dict.fromkeys(pendentes)), columns)
+        for key, (canonical, _) in list(aliases.items()):
+            if canonical in cache or canonical in lote:
+                continue
+            del aliases[key]
+            novos.append(key)
+            self._matchers[model].add(key)
+            if (model, canonical) in self._homonimos:
+                self.homonyms.append(
+                    f"{label} '{nomes[key]}': parecido com '{canonical}', que tem "
+                    f"{self._homonimos[model, canonical]} cadastros com {documento.key.upper()} "
+                    f"diferentes; criado um cadastro sem {documento.key.upper()}"
+                )
+
+        # Criar os que não existem (sem documento: a chave é o nome)
+        conflito = {"index_where": documento.is_(None)} if documento is not None else {}
+        criados = 0
+        for parte in chunks(novos, self.batch_size):
+            stmt = (
+                pg_insert(model)
+                .values([
+                    {"nome": nomes[key], "nome_normalizado": key, **defaults}
+                    for key in parte
+                ])
+                .on_conflict_do_nothing(index_elements=[model.nome_normalizado], **conflito)
+                .returning(model.nome_normalizado, *columns)
+            )
+            for key, *values in self.db.execute(stmt):
+                self._remember(cache, key, (key, *values))
+                criados += 1
+
+        # Criados por outra importação concorrente entre a busca e o INSERT
+        pendentes = [key for key in novos if key not in cache]
+        if pendentes:
+            self._fetch(model, cache, pendentes, columns)
+
+        for key in novos:
+            if (model, key) in self._homonimos:
+                self.homonyms.append(
+                    f"{label} '{nomes[key]}': {self._homonimos[model, key]} cadastros com esse nome "
+                    f"e {documento.key.upper()} diferentes; procedimentos associados a um cadastro "
+                    f"sem {documento.key.upper()}"
+                )
+
+        for key, (canonical, similarity) in aliases.items():
+            self._remember(cache, key, cache[canonical])
+            self.merges.append(
+                f"{label} '{nomes[key]}' associado a '{canonical}' "
+                f"(similaridade {similarity:.0%})"
+            )
+
+        return criados
+
+    def _fetch(self, model, cache: Dict[str, tuple], keys: List[str], columns: tuple) -> None:
+        """
+        Carrega no cache as linhas existentes para as chaves informadas
+
+        Médicos / pacientes com mais de um cadastro pelo nome: vale o cadastro
+        sem documento; sem ele, só um cadastro único. Nomes ambíguos ficam
+        fora do cache (e em _homonimos).
+        """
+        documento = DOCUMENTOS.get(model)
+        for parte in chunks(keys, self.batch_size):
+            if documento is None:
+                stmt = (
+                    select(model.nome_normalizado, *columns)
+                    .where(model.nome_normalizado.in_(parte))
+                )
+                for key, *values in self.db.execute(stmt):
+                    self._remember(cache, key, (key, *values))
+                continue
+
+            encontrados: Dict[str, list] = {}
+            stmt = (
+                select(model.nome_normalizado, documento, *columns)
+                .where(model.nome_normalizado.in_(parte))
+            )
+            for key, doc, *values in self.db.execute(stmt):
+                encontrados.setdefault(key, []).append((doc, values))
+
+            for key, cadastros in encontrados.items():
+                sem_documento = [values for doc, values in cadastros if doc is None]
+                if sem_documento or len(cadastros) == 1:
+                    values = (sem_documento or [cadastros[0][1]])[0]
+                    self._remember(cache, key, (key, *values))
+                else:
+                    self._homonimos[model, key] = len(cadastros)
+
+    def _remember(self, cache: Dict[str, tuple], key: str, value: tuple) -> None:
+        cache[key] = value
+        self._journal.append((cache, key))
+
+    def _matcher(self, model) -> NameMatcher:
+        """
+        Índice de trigramas com os nomes da tabela (1x por import)
+
+        Nomes de homônimos ambíguos (vários cadastros, todos com documento)
+        ficam de fora: _fetch não teria um cadastro para associar.
+        """
+        if model not in self._matchers:
+            stmt = select(model.nome_normalizado)
+            documento = DOCUMENTOS.get(model)
+            if documento is not None:
+                stmt = stmt.group_by(model.nome_normalizado).having(
+                    (func.count() == 1) | (func.count(documento) < func.count())
+                )
+            keys = self.db.execute(stmt).scalars()
+            self._matchers[model] = NameMatcher(keys, self.fuzzy_threshold, settings.IMPORT_FUZZY_MAX_BLOCK)
+        return self._matchers[model]
+
+    # ------------------------------------------
+    # Processamento
+    # ------------------------------------------
+
+    def write(self, prepared: PreparedBatch) -> int:
+        """
+        Grava um lote já pré-processado (ver import_preprocess)
+
+        Retorna quantos procedimentos foram inseridos.
+        """
+        validas = prepared.rows
+        self.errors.extend(prepared.errors)
+        self.rows_processed += prepared.size
+
+        if not validas:
+            return 0
+
+        # Nomes distintos do lote (primeira grafia encontrada é a usada na criação)
+        tipos, medicos, pacientes = {}, {}, {}
+        for row in validas:
+            tipos.setdefault(row.tipo_key, row.tipo)
+            medicos.setdefault(row.medico_key, row.medico)
+            pacientes.setdefault(row.paciente_key, row.paciente)
+
+        self.created["medicos"] += self._resolve(
+            Medico, self._medicos, medicos, DEFAULTS_MEDICO, (Medico.id,), label="Médico"
+        )
+        self.created["pacientes"] += self._resolve(
+            Paciente, self._pacientes, pacientes, DEFAULTS_PACIENTE, (Paciente.id,), label="Paciente"
+        )
+        self.created["tiposProcedimento"] += self._resolve(
+            TipoProcedimento, self._tipos, tipos, DEFAULTS_TIPO,
+            (TipoProcedimento.id, TipoProcedimento.valor_referencia)
+        )
+
+        # Montar procedimentos
+        registros = []
+        for row in validas:
+            tipo_key, tipo_id, valor_referencia = self._tipos[row.tipo_key]
+            medico_key, medico_id = self._medicos[row.medico_key]
+            paciente_key, paciente_id = self._pacientes[row.paciente_key]
+            registros.append({
+                "data": row.data,
+                "tipo_id": tipo_id,
+                "medico_id": medico_id,
+                "paciente_id": paciente_id,
+                "valor": valor_referencia if valor_referencia else None,
+                "observacoes": None,
+                # Chaves canônicas: variações do mesmo nome geram o mesmo hash
+                "fingerprint": row_fingerprint(row.data, tipo_key, medico_key, paciente_key),
+            })
+
+        # INSERT em lotes (executemany); duplicatas são ignoradas pelo banco.
+        # As linhas inseridas (RETURNING) atualizam o rollup mensal e os rankings.
+        stmt = (
+            pg_insert(Procedimento)
+            .on_conflict_do_nothing(index_elements=[Procedimento.fingerprint])
+            .returning(Procedimento.data, Procedimento.medico_id, Procedimento.tipo_id,
+                       Procedimento.paciente_id, Procedimento.valor)
+        )
+        inseridos = 0
+        for parte in chunks(registros, self.batch_size):
+            linhas = self.db.execute(stmt, parte).all()
+            rollup.registrar(self.db, [(d, medico, tipo, valor) for d, medico, tipo, _, valor in linhas])
+            ranking.registrar(self.db, linhas)
+            inseridos += len(linhas)
+
+        self.success += inseridos
+        self.duplicates += len(registros) - inseridos
+        return inseridos
+
+    def run(self, batches: Iterable[Sequence[ImportRow]],
+            on_progress: Optional[Callable[["ImportEngine"], None]] = None) -> None:
+        """
+        Processa uma sequência de lotes, numerando as linhas continuamente
+
+        O pré-processamento (validação, datas, nomes) passa pelo
+        RowPreprocessor, que pode adiantar os próximos lotes num pool de
+        processos. `on_progress` (opcional) é chamado após cada lote gravado.
+        """
+        for prepared in self.preprocessor.prepare(batches):
+            self.write(prepared)
+            if on_progress:
+                on_progress(self)
+
+    def execute(self, rows: Iterable[ImportRow], chunk_size: Optional[int] = None,
+                checkpoint_key: Optional[str] = None,
+                on_progress: Optional[Callable[["ImportEngine"], None]] = None) -> None:
+        """
+        Importa e grava as linhas
+
+        Sem `chunk_size` (nem IMPORT_COMMIT_EVERY), tudo vai numa transação só.
+        """
+        chunk_size = chunk_size or settings.IMPORT_COMMIT_EVERY
+        if chunk_size:
+            self.run_chunked(rows, chunk_size, checkpoint_key, on_progress)
+        else:
+            self.run(batched(rows, self.batch_size), on_progress)
+            self.db.commit()
+
+    # ------------------------------------------
+    # Modo em partes (commit a cada N linhas)
+    # ------------------------------------------
+
+    def run_chunked(self, rows: Iterable[ImportRow], chunk_size: int,
+                    checkpoint_key: Optional[str] = None,
+                    on_progress: Optional[Callable[["ImportEngine"], None]] = None) -> None:
+        """
+        Grava a cada `chunk_size` linhas
+
+        - Cada parte roda num SAVEPOINT: se falhar, só ela é desfeita e suas
+          linhas entram em `errors`; as demais seguem normalmente
+        - Com `checkpoint_key`, o progresso é salvo em import_checkpoints a
+          cada commit; repetir a importação com a mesma chave retoma a
+          partir da última parte lida e tenta de novo as partes que falharam
+        - Checkpoints sem atualização há mais de IMPORT_CHECKPOINT_TTL_SECONDS
+          são apagados (a chave volta a valer como nova)
+        """
+        checkpoint = None
+        skip = 0
+        retry: List[Tuple[int, int]] = []
+        if checkpoint_key:
+            self._prune_checkpoints()
+            # ON CONFLICT: duas requisições com a mesma chave não falham na
+            # chave primária; a segunda lê o checkpoint da primeira
+            self.db.execute(
+                pg_insert(ImportCheckpoint)
+                .values(id=checkpoint_key, rows_committed=0, state={})
+                .on_conflict_do_nothing(index_elements=[ImportCheckpoint.id])
+            )
+            self.db.commit()
+            checkpoint = self.db.get(ImportCheckpoint, checkpoint_key)
+            if checkpoint.state:
+                self.restore(checkpoint.state)
+                skip = checkpoint.rows_committed
+                retry = self._reopen_failed()
+
+        start = 1
+        for chunk in batched(rows, chunk_size):
+            end = start + len(chunk) - 1
+
+            # Linhas já lidas numa execução anterior só voltam se a parte falhou
+            trechos = [(max(a, start), min(b, end)) for a, b in retry if a <= end and b >= start]
+            if end > skip:
+                trechos.append((max(start, skip + 1), end))
+
+            for a, b in trechos:
+                if not self._process_chunk(chunk[a - start:b - start + 1], a):
+                    self.failed.append((a, b))
+
+            if trechos:
+                if checkpoint:
+                    checkpoint.rows_committed = max(skip, end)
+                    checkpoint.state = self.state()
+                self.db.commit()
+                if on_progress:
+                    on_progress(self)
+
+            start = end + 1
+
+        if checkpoint:
+            checkpoint.finished = True
+            checkpoint.state = self.state()
+            self.db.commit()
+
+    def _prune_checkpoints(self) -> None:
+        """Apaga checkpoints expirados (IMPORT_CHECKPOINT_TTL_SECONDS)"""
+        limite = datetime.utcnow() - timedelta(seconds=settings.IMPORT_CHECKPOINT_TTL_SECONDS)
+        self.db.execute(delete(ImportCheckpoint).where(ImportCheckpoint.updated_at < limite))
+        self.db.commit()
+
+    def _reopen_failed(self) -> List[Tuple[int, int]]:
+        """
+        Prepara a nova tentativa das partes que falharam (estado restaurado)
+
+        Tira os erros e a contagem dessas linhas, que voltam a ser
+        processadas. Retorna os trechos (primeira linha, última linha).
+        """
+        retry = [tuple(trecho) for trecho in self.failed]
+        self.failed = []
+        if retry:
+            self.rows_processed -= sum(b - a + 1 for a, b in retry)
+            self.errors = [
+                erro for erro in self.errors
+                if not any(a <= erro["row"] <= b for a, b in retry)
+            ]
+        return retry
+
+    def _process_chunk(self, chunk: Sequence[ImportRow], start: int) -> bool:
+        """Processa uma parte dentro de um SAVEPOINT, isolando falhas. Retorna se foi gravada"""
+        counters = (dict(self.created), self.success, self.duplicates,
+                    self.rows_processed, len(self.errors), len(self.merges), len(self.homonyms))
+        self._journal = []
+
+        savepoint = self.db.begin_nested()
+        try:
+            for prepared in self.preprocessor.prepare(chunks(chunk, self.batch_size), start=start):
+                self.write(prepared)
+            savepoint.commit()
+            return True
+        except Exception as e:
+            savepoint.rollback()
+
+            # Desfazer contadores e caches do que não foi gravado
+            created, self.success, self.duplicates, self.rows_processed, n_errors, n_merges, n_homonyms = counters
+            self.created = created
+            del self.errors[n_errors:]
+            del self.merges[n_merges:]
+            del self.homonyms[n_homonyms:]
+            for cache, key in self._journal:
+                cache.pop(key, None)
+            self._matchers.clear()  # Podem conter nomes desfeitos; são reconstruídos
+
+            self.rows_processed += len(chunk)
+            motivo = str(getattr(e, "orig", None) or e).strip().splitlines()[0]  # Sem o SQL completo
+            message = f"Linhas {start}-{start + len(chunk) - 1} não gravadas: {motivo}"
+            self.errors.extend(
+                {"row": idx, "message": message}
+                for idx in range(start, start + len(chunk))
+            )
+            return False
+        finally:
+            self._journal = []
+
+    def state(self) -> dict:
+        """Contadores acumulados (serializáveis, para o checkpoint)"""
+        return {
+            "success": self.success,
+            "duplicates": self.duplicates,
+            "rows_processed": self.rows_processed,
+            "created": dict(self.created),
+            "errors": list(self.errors),
+            "merges": list(self.merges),
+            "homonyms": list(self.homonyms),
+            "failed": [list(trecho) for trecho in self.failed],
+        }
+
+    def restore(self, state: dict) -> None:
+        """Retoma contadores salvos por state()"""
+        self.success = state.get("success", 0)
+        self.duplicates = state.get("duplicates", 0)
+        self.rows_processed = state.get("rows_processed", 0)
+        self.created.update(state.get("created", {}))
+        self.errors = list(state.get("errors", []))
+        self.merges = list(state.get("merges", []))
+        self.homonyms = list(state.get("homonyms", []))
+        self.failed = [tuple(trecho) for trecho in state.get("failed", [])]
+
+    # ------------------------------------------
+    # Validação sem gravar (dry run)
+    # ------------------------------------------
+
+    def _preview_names(self, model, nomes: Dict[str, str], counter: str,
+                       label: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Como cada nome seria resolvido no import, só com leituras
+
+        Retorna {chave: {"status": "existente" | "aproximado" | "novo", "nome": chave canônica}}
+        """
+        previews = self._previews.setdefault(model, {})
+        faltando = [key for key in nomes if key not in previews]
+        if not faltando:
+            return previews
+
+        existentes: Dict[str, tuple] = {}
+        self._fetch(model, existentes, faltando, (model.id,))
+
+        matcher = self._matcher(model) if label and 0 < self.fuzzy_threshold < 1 else None
+        for key in faltando:
+            if key in existentes:
+                previews[key] = {"status": "existente", "nome": key}
+                continue
+
+            homonimos = self._homonimos.get((model, key))
+            if homonimos:
+                self.homonyms.append(
+                    f"{label} '{nomes[key]}': {homonimos} cadastros com esse nome; "
+                    "seria criado um cadastro sem documento"
+                )
+            match = matcher.match(key) if matcher and not homonimos else None
+            if match:
+                canonical, similarity = match
+                previews[key] = {"status": "aproximado", "nome": canonical, "similaridade": round(similarity, 2)}
+                self.merges.append(
+                    f"{label} '{nomes[key]}' seria associado a '{canonical}' "
+                    f"(similaridade {similarity:.0%})"
+                )
+            else:
+                previews[key] = {"status": "novo", "nome": key}
+                if matcher:
+                    matcher.add(key)  # Como no import: grafias seguintes casam com este
+                self.created[counter] += 1
+
+        return previews
+
+    def preview(self, prepared: PreparedBatch) -> List[dict]:
+        """
+        Valida um lote pré-processado sem escrever no banco
+
+        Retorna um resultado por linha, na ordem:
+        - {"row", "status": "error", "message"}
+        - {"row", "status": "ok" | "duplicate", "medico", "paciente", "tipo"}
+          (cada entidade com a resolução prevista por _preview_names)
+
+        Os contadores (success, duplicates, created, errors) acumulam o que
+        o import faria, para o result() final.
+        """
+        validas = prepared.rows
+        self.errors.extend(prepared.errors)
+        self.rows_processed += prepared.size
+        resultados = {
+            error["row"]: {"row": error["row"], "status": "error", "message": error["message"]}
+            for error in prepared.errors
+        }
+
+        tipos, medicos, pacientes = {}, {}, {}
+        for row in validas:
+            tipos.setdefault(row.tipo_key, row.tipo)
+            medicos.setdefault(row.medico_key, row.medico)
+            pacientes.setdefault(row.paciente_key, row.paciente)
+
+        medicos = self._preview_names(Medico, medicos, "medicos", label="Médico")
+        pacientes = self._preview_names(Paciente, pacientes, "pacientes", label="Paciente")
+        tipos = self._preview_names(TipoProcedimento, tipos, "tiposProcedimento")
+
+        linhas = []
+        for row in validas:
+            resolucao = {
+                "medico": medicos[row.medico_key],
+                "paciente": pacientes[row.paciente_key],
+                "tipo": tipos[row.tipo_key],
+            }
+            fingerprint = row_fingerprint(
+                row.data, resolucao["tipo"]["nome"],
+                resolucao["medico"]["nome"], resolucao["paciente"]["nome"]
+            )
+            linhas.append((row.row, fingerprint, resolucao))
+
+        # Duplicatas: já importadas antes ou repetidas no próprio arquivo
+        importados = set()
+        for parte in chunks([fingerprint for _, fingerprint, _ in linhas], self.batch_size):
+            importados.update(self.db.execute(
+                select(Procedimento.fingerprint).where(Procedimento.fingerprint.in_(parte))
+            ).scalars())
+
+        for idx, fingerprint, resolucao in linhas:
+            if fingerprint in importados or fingerprint in self._fingerprints:
+                self.duplicates += 1
+                resultados[idx] = {"row": idx, "status": "duplicate", **resolucao}
+            else:
+                self._fingerprints.add(fingerprint)
+                self.success += 1
+                resultados[idx] = {"row": idx, "status": "ok", **resolucao}
+
+        return [resultados[idx] for idx in sorted(resultados)]
+
+    def dry_run(self, batches: Iterable[Sequence[ImportRow]]) -> Iterator[dict]:
+        """Valida lote a lote, devolvendo os resultados por linha assim que prontos"""
+        for prepared in self.preprocessor.prepare(batches):
+            yield from self.preview(prepared)
+
+    # ------------------------------------------
+    # Resultado
+    # ------------------------------------------
+
+    def warnings(self) -> List[str]:
+        """Avisos sobre entidades criadas automaticamente"""
+        warnings = []
+        if self.created["medicos"] > 0:
+            warnings.append(
+                f"{self.created['medicos']} médico(s) foram criados automaticamente. "
+                "Edite os registros para adicionar CRM e especialidade."
+            )
+        if self.created["pacientes"] > 0:
+            warnings.append(
+                f"{self.created['pacientes']} paciente(s) foram criados automaticamente. "
+                "Complete os dados cadastrais (CPF, telefone, etc)."
+            )
+        if self.created["tiposProcedimento"] > 0:
+            warnings.append(
+                f"{self.created['tiposProcedimento']} tipo(s) de procedimento foram criados. "
+                "Configure os valores de referência."
+            )
+        if self.merges:
+            warnings.append(
+                f"{len(self.merges)} nome(s) foram associados a cadastros parecidos. "
+                "Confira as junções abaixo."
+            )
+            warnings.extend(self.merges[:FUZZY_WARNINGS_MAX])
+            if len(self.merges) > FUZZY_WARNINGS_MAX:
+                warnings.append(f"... e mais {len(self.merges) - FUZZY_WARNINGS_MAX} junção(ões).")
+        if self.homonyms:
+            warnings.append(
+                f"{len(self.homonyms)} nome(s) têm homônimos cadastrados (documentos diferentes). "
+                "Confira os procedimentos associados."
+            )
+            warnings.extend(self.homonyms[:FUZZY_WARNINGS_MAX])
+        if self.duplicates > 0:
+            warnings.append(
+                f"{self.duplicates} linha(s) ignoradas por já terem sido importadas."
+            )
+        return warnings
+
+    def result(self) -> ImportResult:
+        """Monta o ImportResult com as estatísticas acumuladas"""
+        return ImportResult(
+            success=self.success,
+            errors=self.errors,
+            created={
+                **self.created,
+                "procedimentos": self.success
+            },
+            warnings=self.warnings(),
+            duplicates=self.duplicates
+        )
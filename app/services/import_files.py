@@ -0,0 +1,182 @@
+"""
+Leitura incremental de planilhas (CSV/XLSX) para importação
+
+Os leitores devolvem ImportRow uma a uma, sem carregar o arquivo inteiro
+em memória. `batched` agrupa as linhas em lotes de tamanho fixo para o
+ImportEngine.
+"""
+import codecs
+import csv
+from datetime import date, datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from app.core.text import normalize_name
+from app.schemas.import_schema import ImportRow
+
+
+# Cabeçalhos aceitos (normalizados) -> campo do ImportRow
+HEADER_ALIASES = {
+    "data": "data",
+    "nome do procedimento": "nomeProcedimento",
+    "nomeprocedimento": "nomeProcedimento",
+    "procedimento": "nomeProcedimento",
+    "nome dos medicos": "nomeMedicos",
+    "nome do medico": "nomeMedicos",
+    "nomemedicos": "nomeMedicos",
+    "medicos": "nomeMedicos",
+    "medico": "nomeMedicos",
+    "nome do paciente": "nomePaciente",
+    "nomepaciente": "nomePaciente",
+    "paciente": "nomePaciente",
+}
+
+REQUIRED_FIELDS = ("data", "nomeProcedimento", "nomeMedicos", "nomePaciente")
+
+CSV_DELIMITERS = ",;\t"
+
+# Tentadas nessa ordem (utf-8-sig também aceita UTF-8 sem BOM)
+CSV_ENCODINGS = ("utf-8-sig", "cp1252")
+CSV_DETECT_BLOCK = 1024 * 1024
+
+
+class ImportFileError(ValueError):
+    """Arquivo inválido (formato ou cabeçalho)"""
+
+
+def map_headers(headers: Iterable) -> Dict[str, int]:
+    """
+    Mapeia cabeçalhos da planilha para campos do ImportRow
+
+    Retorna {campo: índice da coluna}. Levanta ImportFileError se faltar
+    alguma coluna obrigatória.
+    """
+    mapping = {}
+    for position, header in enumerate(headers):
+        field = HEADER_ALIASES.get(normalize_name(str(header or "")))
+        if field and field not in mapping:
+            mapping[field] = position
+
+    missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+    if missing:
+        raise ImportFileError(
+            "Colunas obrigatórias ausentes: " + ", ".join(missing)
+        )
+    return mapping
+
+
+def _cell_to_str(value) -> str:
+    """Converte valor de célula para string (datas em YYYY-MM-DD)"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _build_row(values: List, mapping: Dict[str, int]) -> ImportRow:
+    """Monta ImportRow a partir dos valores de uma linha"""
+    return ImportRow(**{
+        field: _cell_to_str(values[position]) if position < len(values) else ""
+        for field, position in mapping.items()
+    })
+
+
+def detect_encoding(file: BinaryIO) -> str:
+    """
+    Codificação do CSV: UTF-8 (com ou sem BOM) ou Windows-1252
+
+    O Excel em pt-BR exporta CSV em Windows-1252; decodificar como UTF-8
+    com substituição gravaria "Jo�o" no lugar de "João" (e criaria
+    cadastros novos). Lê o arquivo inteiro em blocos, sem guardá-lo, e volta
+    ao início. Levanta ImportFileError se nenhuma das duas servir.
+    """
+    for encoding in CSV_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        file.seek(0)
+        try:
+            for block in iter(lambda: file.read(CSV_DETECT_BLOCK), b""):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            continue
+        file.seek(0)
+        return encoding
+    raise ImportFileError("Codificação do arquivo não reconhecida. Salve o CSV como UTF-8")
+
+
+def iter_csv_rows(file: BinaryIO, encoding: Optional[str] = None) -> Iterator[ImportRow]:
+    """
+    Lê um CSV linha a linha (separador detectado: vírgula, ponto-vírgula ou TAB)
+
+    Sem `encoding`, detecta entre UTF-8 e Windows-1252 (ver detect_encoding).
+    """
+    if encoding is None:
+        encoding = detect_encoding(file)
+    text = codecs.getreader(encoding)(file)
+
+    first_line = text.readline()
+    if not first_line.strip():
+        raise ImportFileError("Arquivo vazio")
+
+    try:
+        dialect = csv.Sniffer().sniff(first_line, delimiters=CSV_DELIMITERS)
+        delimiter = dialect.delimiter
+    except csv.Error:
+        delimiter = ","
+
+    mapping = map_headers(next(csv.reader([first_line], delimiter=delimiter)))
+
+    for values in csv.reader(text, delimiter=delimiter):
+        if not any(value.strip() for value in values):
+            continue  # Pular linhas em branco
+        yield _build_row(values, mapping)
+
+
+def iter_xlsx_rows(file: BinaryIO) -> Iterator[ImportRow]:
+    """Lê a primeira aba de um XLSX em modo streaming (openpyxl read_only)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("Suporte a XLSX indisponível (instale openpyxl)")
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f"Arquivo XLSX inválido: {str(e)}")
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            raise ImportFileError("Arquivo vazio")
+        mapping = map_headers(headers)
+
+        for values in rows:
+            if not any(_cell_to_str(value) for value in values):
+                continue  # Pular linhas em branco
+            yield _build_row(list(values), mapping)
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(file: BinaryIO, filename: Optional[str]) -> Iterator[ImportRow]:
+    """Escolhe o leitor pela extensão do arquivo"""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(file)
+    if name.endswith((".csv", ".txt", ".tsv")) or not name:
+        return iter_csv_rows(file)
+    raise ImportFileError("Formato não suportado. Envie um arquivo .csv ou .xlsx")
+
+
+def batched(rows: Iterable[ImportRow], size: int) -> Iterator[List[ImportRow]]:
+    """Agrupa linhas em lotes de tamanho fixo"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
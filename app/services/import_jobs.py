@@ -0,0 +1,157 @@
+"""
+Importações em background
+
+Um import grande pode passar do timeout do proxy se rodar dentro da
+requisição. Aqui o import roda num pool de threads (cada job com sua
+própria sessão) e o progresso fica num registro em memória consultado
+por GET /import/jobs/{id}.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.schemas.import_schema import ImportJobStatus, ImportResult, ImportRow
+from app.services.import_engine import ImportEngine
+
+
+class ImportQueueFull(Exception):
+    """Limite de jobs pendentes/em andamento atingido (IMPORT_JOBS_MAX_PENDING)"""
+    pass
+
+
+class ImportJob:
+    """Estado de uma importação em background"""
+
+    def __init__(self, rows_total: int, owner_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.owner_id = owner_id  # Usuário que enviou (só ele consulta o job)
+        self.status = "pending"
+        self.rows_total = rows_total
+        self.rows_processed = 0
+        self.errors: List[dict] = []
+        self.result: Optional[ImportResult] = None
+        self.detail: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._started = None  # time.monotonic() do início
+        self._elapsed = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def rows_per_second(self) -> float:
+        if self._started is None:
+            return 0.0
+        elapsed = self._elapsed if self.finished else time.monotonic() - self._started
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0.0
+
+    def to_status(self) -> ImportJobStatus:
+        return ImportJobStatus(
+            id=self.id,
+            status=self.status,
+            rows_total=self.rows_total,
+            rows_processed=self.rows_processed,
+            rows_per_second=self.rows_per_second(),
+            errors=list(self.errors),
+            result=self.result,
+            detail=self.detail,
+            created_at=self.created_at,
+            finished_at=self.finished_at
+        )
+
+
+class ImportJobRegistry:
+    """
+    Registro de jobs com retenção limitada
+
+    Jobs finalizados expiram após `ttl` segundos e, acima de `max_jobs`,
+    os mais antigos são descartados. Jobs em andamento nunca são removidos.
+    Com `max_pending` jobs pendentes ou em andamento, novos envios são
+    recusados (ImportQueueFull) em vez de crescer a fila do pool.
+    """
+
+    def __init__(self, max_jobs: int, ttl: int, workers: int, max_pending: int):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import")
+
+    def _prune(self) -> None:
+        """Remove jobs finalizados expirados ou excedentes (chamar com lock)"""
+        now = datetime.utcnow()
+        finished = [job for job in self._jobs.values() if job.finished]
+
+        for job in finished:
+            if (now - job.finished_at).total_seconds() > self.ttl:
+                del self._jobs[job.id]
+
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.max_jobs)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str, owner_id: Optional[str] = None) -> Optional[ImportJob]:
+        """Job pelo id; None se não existir ou for de outro usuário"""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        return job
+
+    def submit(self, rows: List[ImportRow], chunk_size: Optional[int] = None,
+               checkpoint_key: Optional[str] = None, owner_id: Optional[str] = None) -> ImportJob:
+        """Cria o job e agenda a execução no pool (ImportQueueFull se a fila estiver cheia)"""
+        job = ImportJob(rows_total=len(rows), owner_id=owner_id)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for queued in self._jobs.values() if not queued.finished)
+            if pending >= self.max_pending:
+                raise ImportQueueFull(
+                    f"{pending} importações na fila; tente novamente em alguns minutos"
+                )
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, rows, chunk_size, checkpoint_key)
+        return job
+
+    def _run(self, job: ImportJob, rows: List[ImportRow], chunk_size: Optional[int],
+             checkpoint_key: Optional[str]) -> None:
+        db = SessionLocal()
+        importer = ImportEngine(db)
+
+        def on_progress(engine: ImportEngine) -> None:
+            job.rows_processed = engine.rows_processed
+            job.errors = engine.errors
+
+        job.status = "running"
+        job._started = time.monotonic()
+        status = "failed"
+        try:
+            importer.execute(rows, chunk_size=chunk_size, checkpoint_key=checkpoint_key,
+                             on_progress=on_progress)
+            job.result = importer.result()
+            status = "done"
+        except Exception as e:
+            db.rollback()
+            job.detail = f"Erro ao salvar no banco de dados: {str(e)}"
+        finally:
+            db.close()
+            job._elapsed = time.monotonic() - job._started
+            job.finished_at = datetime.utcnow()
+            job.status = status  # Por último: só então o job conta como finalizado
+
+
+job_registry = ImportJobRegistry(
+    max_jobs=settings.IMPORT_JOBS_MAX,
+    ttl=settings.IMPORT_JOB_TTL_SECONDS,
+    workers=settings.IMPORT_WORKERS,
+    max_pending=settings.IMPORT_JOBS_MAX_PENDING
+)
@@ -0,0 +1,176 @@
+"""
+Pré-processamento das linhas importadas (antes do banco)
+
+Validação dos campos obrigatórios, conversão de datas e normalização dos
+nomes são puro Python. Em planilhas grandes esse trabalho pode rodar em um
+pool de processos (IMPORT_PREPROCESS_WORKERS), lote a lote, enquanto o
+ImportEngine grava os lotes anteriores. Lotes pequenos (menos de
+IMPORT_PREPROCESS_MIN_ROWS linhas) são processados no próprio processo.
+
+Este módulo só depende de app.core.text: os processos do pool importam
+apenas ele, sem carregar models nem conexão com o banco.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.text import normalize_name
+
+
+@lru_cache(maxsize=4096)
+def parse_date(date_str: str) -> date:
+    """
+    Converte string de data para date object
+
+    Memoizado: planilhas repetem muito as mesmas datas.
+    """
+    # Tentar formato ISO (YYYY-MM-DD)
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        pass
+
+    # Tentar formato brasileiro (DD/MM/YYYY)
+    try:
+        return datetime.strptime(date_str, "%d/%m/%Y").date()
+    except ValueError:
+        raise ValueError(f"Formato de data inválido: {date_str}. Use YYYY-MM-DD ou DD/MM/YYYY")
+
+
+class ParsedRow(NamedTuple):
+    """Linha válida, com data convertida e nomes normalizados"""
+    row: int
+    data: date
+    tipo: str
+    medico: str
+    paciente: str
+    tipo_key: str
+    medico_key: str
+    paciente_key: str
+
+
+class PreparedBatch(NamedTuple):
+    """Lote pré-processado: linhas válidas + erros, na ordem da planilha"""
+    start: int
+    size: int
+    rows: List[ParsedRow]
+    errors: List[dict]
+
+
+# (data, nomeProcedimento, nomeMedicos, nomePaciente)
+RowValues = Tuple[str, str, str, str]
+
+
+def check_row(idx: int, values: RowValues) -> Tuple[Optional[ParsedRow], Optional[str]]:
+    """
+    Valida campos obrigatórios e converte a data
+
+    Retorna (ParsedRow, None) ou (None, mensagem de erro)
+    """
+    data, tipo, medico, paciente = values
+
+    # Validar dados obrigatórios
+    if not data:
+        return None, "Data é obrigatória"
+
+    if not tipo:
+        return None, "Nome do procedimento é obrigatório"
+
+    if not medico:
+        return None, "Nome do médico é obrigatório"
+
+    if not paciente:
+        return None, "Nome do paciente é obrigatório"
+
+    # Converter data
+    try:
+        data_procedimento = parse_date(data)
+    except ValueError as e:
+        return None, str(e)
+
+    tipo, medico, paciente = tipo.strip(), medico.strip(), paciente.strip()
+    return ParsedRow(
+        idx, data_procedimento, tipo, medico, paciente,
+        normalize_name(tipo), normalize_name(medico), normalize_name(paciente),
+    ), None
+
+
+def prepare_batch(values: Sequence[RowValues], start: int = 1) -> PreparedBatch:
+    """Pré-processa um lote (roda no pool de processos ou localmente)"""
+    rows, errors = [], []
+    for idx, row_values in enumerate(values, start=start):
+        parsed, message = check_row(idx, row_values)
+        if parsed:
+            rows.append(parsed)
+        else:
+            errors.append({"row": idx, "message": message})
+    return PreparedBatch(start, len(values), rows, errors)
+
+
+def row_values(rows: Iterable) -> List[RowValues]:
+    """ImportRow -> tuplas simples (mais baratas de enviar ao pool)"""
+    return [(row.data, row.nomeProcedimento, row.nomeMedicos, row.nomePaciente) for row in rows]
+
+
+# Pool compartilhado entre imports (criado sob demanda)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: não herda conexões nem threads do servidor. Os processos
+            # reimportam o __main__ do pai; efeitos colaterais do app (ex:
+            # create_all) ficam no lifespan de app/main.py, não no módulo
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+class RowPreprocessor:
+    """
+    Transforma lotes de ImportRow em PreparedBatch, em ordem
+
+    Uso:
+        preprocessor = RowPreprocessor(workers=4, min_rows=500)
+        for prepared in preprocessor.prepare(batches):
+            ...
+
+    Com workers > 0, até 2 * workers lotes são pré-processados à frente do
+    consumidor (memória limitada mesmo para arquivos lidos em streaming).
+    """
+
+    def __init__(self, workers: int = 0, min_rows: int = 0):
+        self.workers = workers
+        self.min_rows = min_rows
+
+    def prepare(self, batches: Iterable[Sequence], start: int = 1) -> Iterator[PreparedBatch]:
+        pending = deque()  # Futures (ou lotes prontos) na ordem da planilha
+        ahead = max(1, self.workers * 2)
+
+        for batch in batches:
+            values = row_values(batch)
+            if self.workers > 0 and len(values) >= self.min_rows:
+                pending.append(_get_pool(self.workers).submit(prepare_batch, values, start))
+            else:
+                pending.append(prepare_batch(values, start))
+            start += len(values)
+
+            while len(pending) >= ahead or (pending and isinstance(pending[0], PreparedBatch)):
+                yield self._result(pending.popleft())
+
+        while pending:
+            yield self._result(pending.popleft())
+
+    @staticmethod
+    def _result(item) -> PreparedBatch:
+        return item if isinstance(item, PreparedBatch) else item.result()
@@ -0,0 +1,90 @@
+"""
+Paginação por cursor (keyset) das listagens de procedimentos
+
+Em vez de OFFSET (que lê e descarta todas as linhas anteriores), cada página
+continua a partir da última linha da página anterior, na ordem
+(data DESC, id DESC):
+
+    WHERE (data, id) < (:data, :id) ORDER BY data DESC, id DESC LIMIT :limit
+
+Com os índices compostos (data, id), (medico_id, data, id) e
+(paciente_id, data, id) em procedimentos, a página N custa o mesmo que a
+primeira.
+
+O cursor é opaco para o cliente: base64 de "data|id" da última linha.
+
+Tipo, médico e paciente de cada procedimento listado vêm no mesmo SELECT
+(JOIN, ver com_relacionamentos), em vez de um SELECT por linha quando o
+código acessa p.tipo / p.medico / p.paciente. Com offset ou cursor, uma
+página custa uma consulta só.
+
+paginar() também aceita consultas só de colunas (app/services/fieldsets.py),
+desde que tragam `data` e `id`.
+"""
+import base64
+import binascii
+import uuid
+from datetime import date
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+
+from app.models.procedimento import Procedimento
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado (não foi gerado por esta API)"""
+
+
+def encode_cursor(data: date, procedimento_id) -> str:
+    texto = f"{data.isoformat()}|{procedimento_id}"
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, uuid.UUID]:
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data, procedimento_id = texto.split("|")
+        return date.fromisoformat(data), uuid.UUID(procedimento_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Cursor inválido") from e
+
+
+# Relacionamentos muitos-para-um (FKs obrigatórias): INNER JOIN na mesma consulta
+CARREGAR_RELACIONAMENTOS = (
+    joinedload(Procedimento.tipo, innerjoin=True),
+    joinedload(Procedimento.medico, innerjoin=True),
+    joinedload(Procedimento.paciente, innerjoin=True),
+)
+
+
+def com_relacionamentos(query):
+    """Carrega tipo, médico e paciente junto com os procedimentos"""
+    return query.options(*CARREGAR_RELACIONAMENTOS)
+
+
+def ordenar(query):
+    """Ordem estável das listagens (mais recentes primeiro)"""
+    return query.order_by(Procedimento.data.desc(), Procedimento.id.desc())
+
+
+def paginar(query, cursor: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Uma página de procedimentos a partir do cursor (None = primeira página)
+
+    Retorna (procedimentos ou linhas, next_cursor); next_cursor é None na
+    última página.
+    """
+    if cursor:
+        data, procedimento_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Procedimento.data, Procedimento.id) < tuple_(data, procedimento_id))
+
+    # Uma linha a mais só para saber se existe próxima página
+    procedimentos = ordenar(query).limit(limit + 1).all()
+    if len(procedimentos) <= limit:
+        return procedimentos, None
+
+    procedimentos = procedimentos[:limit]
+    ultimo = procedimentos[-1]
+    return procedimentos, encode_cursor(ultimo.data, ultimo.id)
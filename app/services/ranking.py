@@ -0,0 +1,143 @@
+"""
+Rankings (top N) de médicos, tipos e pacientes (tabela rankings)
+
+Guarda quantidade e soma de valor por (dimensão, período, entidade), com
+período = mês (YYYY-MM) ou "total" (todo o histórico). Os índices da tabela
+já estão na ordem do ranking (por quantidade ou por valor), então ler o
+top N custa N entradas, independente do tamanho de procedimentos.
+
+Mantido como o rollup mensal (app/services/rollup.py), na mesma transação
+da escrita:
+- Escritas pelo ORM: evento after_flush da sessão
+- INSERTs em massa (ImportEngine): registrar() com as linhas inseridas
+
+Para recalcular do zero:
+    python scripts/rebuild_rollup.py
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, event, func, literal, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+from app.models.procedimento import Procedimento
+from app.models.ranking import Ranking
+from app.models.tipo_procedimento import TipoProcedimento
+from app.services import rollup
+
+
+PERIODO_TOTAL = "total"
+
+# dimensão -> (coluna em procedimentos, cadastro com o nome)
+DIMENSOES = {
+    "medico": (Procedimento.medico_id, Medico),
+    "tipo": (Procedimento.tipo_id, TipoProcedimento),
+    "paciente": (Procedimento.paciente_id, Paciente),
+}
+
+CAMPOS = ("data", "medico_id", "tipo_id", "paciente_id", "valor")
+
+# (dimensao, periodo, entidade_id) -> [quantidade, valor]
+Deltas = Dict[Tuple[str, str, object], list]
+
+
+def periodo_de(dia: date) -> str:
+    return dia.strftime("%Y-%m")
+
+
+def acumular(deltas: Deltas, data: date, medico_id, tipo_id, paciente_id,
+             valor: Optional[Decimal], sinal: int = 1) -> None:
+    """Soma (ou subtrai, com sinal=-1) um procedimento aos rankings do mês e geral"""
+    for dimensao, entidade_id in (("medico", medico_id), ("tipo", tipo_id), ("paciente", paciente_id)):
+        for periodo in (periodo_de(data), PERIODO_TOTAL):
+            atual = deltas.setdefault((dimensao, periodo, entidade_id), [0, Decimal(0)])
+            atual[0] += sinal
+            atual[1] += sinal * (valor or 0)
+
+
+def registrar(db, linhas: Iterable[tuple]) -> None:
+    """Soma procedimentos inseridos em massa: (data, medico_id, tipo_id, paciente_id, valor)"""
+    deltas: Deltas = {}
+    for linha in linhas:
+        acumular(deltas, *linha)
+    rollup.aplicar(db, deltas, Ranking)
+
+
+def reconstruir(db: Session) -> int:
+    """Recalcula todos os rankings a partir de procedimentos. Retorna o número de linhas"""
+    db.execute(delete(Ranking))
+    # Formato literal (não parâmetro) para a expressão ser a mesma no GROUP BY
+    mes = func.to_char(Procedimento.data, literal_column("'YYYY-MM'"))
+    for dimensao, (coluna, _) in DIMENSOES.items():
+        # GROUPING SETS: por mês e total geral na mesma leitura
+        db.execute(
+            pg_insert(Ranking).from_select(
+                ["dimensao", "periodo", "entidade_id", "total", "valor", "updated_at"],
+                select(
+                    literal(dimensao),
+                    func.coalesce(mes, PERIODO_TOTAL),
+                    coluna,
+                    func.count(),
+                    func.coalesce(func.sum(Procedimento.valor), 0),
+                    func.now(),
+                ).group_by(func.grouping_sets(tuple_(coluna, mes), tuple_(coluna)))
+            )
+        )
+    return db.execute(select(func.count()).select_from(Ranking)).scalar()
+
+
+def top(db: Session, dimensao: str, periodo: str = PERIODO_TOTAL, ordem: str = "total",
+        limit: int = 10) -> list:
+    """Top `limit` entidades da dimensão no período, por quantidade ou valor"""
+    _, model = DIMENSOES[dimensao]
+    criterios = (Ranking.total, Ranking.valor) if ordem == "total" else (Ranking.valor, Ranking.total)
+    rows = db.execute(
+        select(Ranking.entidade_id, model.nome, Ranking.total, Ranking.valor)
+        .join(model, model.id == Ranking.entidade_id)
+        .where(Ranking.dimensao == dimensao, Ranking.periodo == periodo)
+        .order_by(*(c.desc() for c in criterios), Ranking.entidade_id)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "posicao": posicao,
+            "id": entidade_id,
+            "nome": nome,
+            "total": total,
+            "valor": float(valor)
+        }
+        for posicao, (entidade_id, nome, total, valor) in enumerate(rows, start=1)
+    ]
+
+
+# ------------------------------------------
+# Escritas pelo ORM
+# ------------------------------------------
+
+@event.listens_for(SessionLocal, "after_flush")
+def _atualizar_rankings(session: Session, flush_context) -> None:
+    deltas: Deltas = {}
+
+    for obj in session.new:
+        if isinstance(obj, Procedimento):
+            acumular(deltas, *(getattr(obj, campo) for campo in CAMPOS))
+
+    for obj in session.deleted:
+        if isinstance(obj, Procedimento):
+            acumular(deltas, *rollup.valores_anteriores(obj, CAMPOS), sinal=-1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Procedimento) and session.is_modified(obj):
+            anteriores = rollup.valores_anteriores(obj, CAMPOS)
+            atuais = tuple(getattr(obj, campo) for campo in CAMPOS)
+            if anteriores != atuais:
+                acumular(deltas, *anteriores, sinal=-1)
+                acumular(deltas, *atuais)
+
+    if deltas:
+        rollup.aplicar(session.connection(), deltas, Ranking)
@@ -0,0 +1,165 @@
+"""
+Rollup mensal de procedimentos (tabela procedimentos_mensal)
+
+Guarda quantidade e soma de valor por (mês, médico, tipo). O dashboard e o
+relatório mensal leem daqui, então o custo depende de meses x médicos x
+tipos, não do número de procedimentos.
+
+Manutenção incremental, na mesma transação da escrita:
+- Escritas pelo ORM (db.add / alteração / db.delete de Procedimento): o
+  evento after_flush da sessão calcula os deltas automaticamente
+- INSERTs em massa (ImportEngine): chamam registrar() com as linhas
+  efetivamente inseridas (RETURNING)
+
+Para recalcular do zero (ex: depois de SQL manual em procedimentos):
+    python scripts/rebuild_rollup.py
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.procedimento import Procedimento
+from app.models.procedimento_mensal import ProcedimentoMensal
+
+
+# (mes, medico_id, tipo_id) -> [quantidade, valor]
+Deltas = Dict[Tuple[date, object, object], list]
+
+CAMPOS = ("data", "medico_id", "tipo_id", "valor")
+
+# Campos de Procedimento lidos pelo rollup e pelos rankings (app/services/ranking.py)
+CAMPOS_RASTREADOS = {"data", "medico_id", "tipo_id", "paciente_id", "valor"}
+
+
+def mes_de(dia: date) -> date:
+    return dia.replace(day=1)
+
+
+def acumular(deltas: Deltas, data: date, medico_id, tipo_id,
+             valor: Optional[Decimal], sinal: int = 1) -> None:
+    """Soma (ou subtrai, com sinal=-1) um procedimento aos deltas"""
+    chave = (mes_de(data), medico_id, tipo_id)
+    atual = deltas.setdefault(chave, [0, Decimal(0)])
+    atual[0] += sinal
+    atual[1] += sinal * (valor or 0)
+
+
+def aplicar(db, deltas: Deltas, model=ProcedimentoMensal) -> None:
+    """
+    Aplica os deltas com INSERT ... ON CONFLICT DO UPDATE (incremento atômico)
+
+    `model` é uma tabela de totais (chave primária + total + valor); as chaves
+    dos deltas seguem a ordem da chave primária. Chaves em ordem fixa para
+    evitar deadlock entre imports concorrentes. Linhas que chegam a zero
+    procedimentos são removidas.
+    """
+    chave = list(model.__table__.primary_key.columns)
+    valores = [
+        {**{coluna.name: v for coluna, v in zip(chave, k)}, "total": total, "valor": valor}
+        for k, (total, valor) in sorted(deltas.items(), key=lambda item: str(item[0]))
+        if total or valor
+    ]
+    if not valores:
+        return
+
+    stmt = pg_insert(model).values(valores)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=chave,
+        set_={
+            "total": model.total + stmt.excluded.total,
+            "valor": model.valor + stmt.excluded.valor,
+            "updated_at": datetime.utcnow(),
+        }
+    ))
+
+    removidos = [tuple(v[coluna.name] for coluna in chave) for v in valores if v["total"] < 0]
+    if removidos:
+        db.execute(delete(model).where(tuple_(*chave).in_(removidos), model.total <= 0))
+
+
+def registrar(db, linhas: Iterable[tuple]) -> None:
+    """Soma ao rollup procedimentos inseridos em massa: (data, medico_id, tipo_id, valor)"""
+    deltas: Deltas = {}
+    for data, medico_id, tipo_id, valor in linhas:
+        acumular(deltas, data, medico_id, tipo_id, valor)
+    aplicar(db, deltas)
+
+
+def reconstruir(db: Session) -> int:
+    """Recalcula o rollup inteiro a partir de procedimentos. Retorna o número de linhas"""
+    db.execute(delete(ProcedimentoMensal))
+    mes = func.date_trunc("month", Procedimento.data).cast(ProcedimentoMensal.mes.type)
+    db.execute(
+        pg_insert(ProcedimentoMensal).from_select(
+            ["mes", "medico_id", "tipo_id", "total", "valor", "updated_at"],
+            select(
+                mes,
+                Procedimento.medico_id,
+                Procedimento.tipo_id,
+                func.count(),
+                func.coalesce(func.sum(Procedimento.valor), 0),
+                func.now(),
+            ).group_by(mes, Procedimento.medico_id, Procedimento.tipo_id)
+        )
+    )
+    return db.execute(select(func.count()).select_from(ProcedimentoMensal)).scalar()
+
+
+# ------------------------------------------
+# Escritas pelo ORM
+# ------------------------------------------
+
+def valores_anteriores(obj, campos=CAMPOS) -> tuple:
+    """Valores de `campos` (padrão: data, medico_id, tipo_id, valor) antes das alterações pendentes"""
+    estado = inspect(obj)
+    valores = []
+    for campo in campos:
+        history = estado.attrs[campo].history
+        anteriores = history.deleted or history.unchanged or history.added
+        valores.append(anteriores[0] if anteriores else None)
+    return tuple(valores)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _carregar_removidos(session: Session, flush_context, instances) -> None:
+    """
+    Carrega os campos expirados dos procedimentos a remover
+
+    No after_flush a linha já foi apagada e não dá mais para ler os valores
+    que rollup e rankings precisam subtrair. Alterações não precisam disso:
+    as colunas usam active_history (ver app/models/procedimento.py).
+    """
+    for obj in session.deleted:
+        if isinstance(obj, Procedimento):
+            faltando = inspect(obj).unloaded & CAMPOS_RASTREADOS
+            if faltando:
+                session.refresh(obj, attribute_names=faltando)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _atualizar_rollup(session: Session, flush_context) -> None:
+    deltas: Deltas = {}
+
+    for obj in session.new:
+        if isinstance(obj, Procedimento):
+            acumular(deltas, obj.data, obj.medico_id, obj.tipo_id, obj.valor)
+
+    for obj in session.deleted:
+        if isinstance(obj, Procedimento):
+            acumular(deltas, *valores_anteriores(obj), sinal=-1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Procedimento) and session.is_modified(obj):
+            anteriores = valores_anteriores(obj)
+            atuais = tuple(getattr(obj, campo) for campo in CAMPOS)
+            if anteriores != atuais:
+                acumular(deltas, *anteriores, sinal=-1)
+                acumular(deltas, *atuais)
+
+    if deltas:
+        aplicar(session.connection(), deltas)
@@ -0,0 +1,85 @@
+"""
+Busca de médicos e pacientes (parâmetro `search` das listagens)
+
+Nome: `nome_normalizado LIKE '%termo%'`, com o termo normalizado do mesmo
+jeito que a coluna (minúsculas, sem acentos, ver app/core/text.py).
+Documento (CRM / CPF): `ILIKE '%termo%'`. Com os índices GIN de trigramas
+(pg_trgm, ver scripts/migrate_search_trgm.sql) essas buscas por trecho usam
+índice em vez de ler a tabela inteira.
+
+Resultados por relevância: nome igual ao termo, nome começando pelo termo,
+alguma palavra do nome começando pelo termo e, por fim, o termo no meio;
+dentro de cada grupo, nomes mais curtos (mais próximos do termo) primeiro.
+
+Termo com cara de documento completo (CPF com 11 dígitos, CRM com número e
+UF opcional) tenta antes a igualdade exata no índice da coluna. Achando,
+só esses registros são retornados.
+"""
+import re
+from typing import List
+
+from sqlalchemy import case, func
+
+from app.core.text import normalize_name
+
+
+_CPF = re.compile(r"^[\d.\-\s]+$")
+_CRM = re.compile(r"^(crm)?[\s/-]*([a-z]{2})?[\s/-]*\d{4,}[\s/-]*([a-z]{2})?$", re.IGNORECASE)
+
+
+def _cpf_exato(termo: str) -> List[str]:
+    """CPF completo, com e sem pontuação"""
+    digitos = re.sub(r"\D", "", termo)
+    if not _CPF.match(termo) or len(digitos) != 11:
+        return []
+    return [digitos, f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"]
+
+
+def _crm_exato(termo: str) -> List[str]:
+    """CRM como digitado e em maiúsculas (ex: 12345-SP)"""
+    if not _CRM.match(termo):
+        return []
+    return list(dict.fromkeys([termo, termo.upper()]))
+
+
+# coluna de documento -> valores exatos a tentar antes da busca geral
+DOCUMENTOS = {
+    "cpf": _cpf_exato,
+    "crm": _crm_exato,
+}
+
+
+def _escapar(termo: str) -> str:
+    """Escapa os curingas do LIKE (%, _ e a própria barra) para busca literal"""
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def buscar(query, model, documento: str, search: str):
+    """
+    Aplica a busca na consulta (de médicos ou pacientes), já ordenada por relevância
+
+    `documento` é a coluna de documento do model ("crm" ou "cpf").
+    """
+    termo = search.strip()
+    coluna = getattr(model, documento)
+
+    # Documento completo: igualdade no índice btree da coluna
+    candidatos = DOCUMENTOS[documento](termo)
+    if candidatos:
+        exato = query.filter(coluna.in_(candidatos))
+        if exato.with_entities(model.id).limit(1).first():
+            return exato.order_by(model.nome, model.id)
+
+    nome = normalize_name(termo)
+    nome_like, termo_like = _escapar(nome), _escapar(termo)
+    relevancia = case(
+        (model.nome_normalizado == nome, 0),
+        (model.nome_normalizado.like(f"{nome_like}%", escape="\\"), 1),
+        (model.nome_normalizado.like(f"% {nome_like}%", escape="\\"), 2),
+        else_=3
+    )
+    # id por último: ordem estável entre páginas para nomes iguais
+    return query.filter(
+        model.nome_normalizado.like(f"%{nome_like}%", escape="\\")
+        | coluna.ilike(f"%{termo_like}%", escape="\\")
+    ).order_by(relevancia, func.length(model.nome), model.nome, model.id)
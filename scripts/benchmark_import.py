@@ -0,0 +1,365 @@
+"""
+Benchmark do import de procedimentos
+
+Gera planilhas sintéticas (nomes brasileiros, erros de digitação, datas em
+vários formatos), roda o import de ponta a ponta pelas rotas de
+app/api/import_routes.py contra um banco local e mede:
+
+- rows_per_second: linhas da planilha por segundo (tempo total da rota)
+- peak_rss_mb: pico de memória do processo durante o import
+- queries: comandos SQL enviados ao banco (executemany conta como 1)
+
+Cada tamanho roda com as tabelas vazias (TRUNCATE antes de cada rodada),
+então use um banco só para isso. O resultado sai em JSON Lines (um objeto
+por rodada) no stdout ou em --output, para comparar execuções ao longo do
+tempo; o resumo legível vai para o stderr.
+
+Uso:
+    python scripts/benchmark_import.py --database-url postgresql://localhost/medcontrol_bench
+    python scripts/benchmark_import.py --sizes 1000,10000 --typo-rate 0.1 --date-format mixed
+    python scripts/benchmark_import.py --mode upload --output bench.jsonl
+    python scripts/benchmark_import.py --write-csv planilha.csv --sizes 5000   # só gera o arquivo
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# Adicionar diretório raiz ao path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# ============================================
+# GERADOR DE PLANILHAS
+# ============================================
+
+PRIMEIROS_NOMES = [
+    "Ana", "Maria", "João", "José", "Pedro", "Paulo", "Lucas", "Mateus", "Gabriel", "Rafael",
+    "Juliana", "Fernanda", "Patrícia", "Camila", "Beatriz", "Larissa", "Letícia", "Aline",
+    "Bruno", "Carlos", "Eduardo", "Felipe", "Gustavo", "Henrique", "Igor", "Júlio", "Leonardo",
+    "Márcia", "Sônia", "Vânia", "Cláudia", "Renata", "Tatiane", "Vinícius", "Rodrigo", "Thiago",
+]
+
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+    "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Araújo", "Melo", "Barbosa", "Cardoso",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes",
+    "Freitas", "Cavalcanti", "Monteiro", "Conceição", "Vieira", "Teixeira", "Correia", "Simões",
+]
+
+PROCEDIMENTOS = [
+    "Consulta", "Retorno", "Exame", "Cirurgia", "Ultrassonografia", "Eletrocardiograma",
+    "Hemograma", "Raio-X", "Tomografia", "Ressonância Magnética", "Endoscopia", "Colonoscopia",
+    "Ecocardiograma", "Biópsia", "Sutura", "Curativo", "Infiltração", "Vacinação",
+]
+
+DATE_FORMATS = {
+    "iso": ["%Y-%m-%d"],
+    "br": ["%d/%m/%Y"],
+    "mixed": ["%Y-%m-%d", "%d/%m/%Y"],
+}
+
+
+def gerar_nomes(rng: random.Random, quantidade: int, partes: int, prefixos=("",)) -> List[str]:
+    """`quantidade` nomes distintos com `partes` sobrenomes"""
+    nomes = set()
+    limite = len(prefixos) * len(PRIMEIROS_NOMES) * len(SOBRENOMES) ** partes
+    if quantidade > limite:
+        raise ValueError(f"Cardinalidade máxima para este tipo de nome: {limite}")
+    while len(nomes) < quantidade:
+        nome = " ".join([rng.choice(PRIMEIROS_NOMES)] + rng.sample(SOBRENOMES, partes))
+        nomes.add((rng.choice(prefixos) + " " + nome).strip())
+    return sorted(nomes)
+
+
+def digitar_com_erro(rng: random.Random, nome: str) -> str:
+    """Um erro de digitação: troca, omissão, repetição de letra, sem acento ou caixa/espaços"""
+    posicao = rng.randrange(1, len(nome) - 1)
+    erro = rng.randrange(6)
+    if erro == 0:  # Letras trocadas
+        return nome[:posicao - 1] + nome[posicao] + nome[posicao - 1] + nome[posicao + 1:]
+    if erro == 1:  # Letra omitida
+        return nome[:posicao] + nome[posicao + 1:]
+    if erro == 2:  # Letra repetida
+        return nome[:posicao] + nome[posicao] + nome[posicao:]
+    if erro == 3:  # Sem acentos (a normalização resolve)
+        return "".join(c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c))
+    if erro == 4:  # Caixa alta (a normalização resolve)
+        return nome.upper()
+    return "  " + nome.replace(" ", "  ") + " "  # Espaços extras (a normalização resolve)
+
+
+def gerar_linhas(size: int, medicos: int, pacientes: int, tipos: int, typo_rate: float,
+                 date_format: str, seed: int) -> List[Dict[str, str]]:
+    """Linhas no formato do ImportRow"""
+    rng = random.Random(seed)
+    nomes_medicos = gerar_nomes(rng, medicos, 1, prefixos=("Dr.", "Dra."))
+    nomes_pacientes = gerar_nomes(rng, pacientes, 2)
+    nomes_tipos = (PROCEDIMENTOS * (tipos // len(PROCEDIMENTOS) + 1))[:tipos]
+    nomes_tipos = [
+        nome if i < len(PROCEDIMENTOS) else f"{nome} {i // len(PROCEDIMENTOS) + 1}"
+        for i, nome in enumerate(nomes_tipos)
+    ]
+    formatos = DATE_FORMATS[date_format]
+    inicio = date(2023, 1, 1)
+
+    def nome(pool: List[str]) -> str:
+        escolhido = rng.choice(pool)
+        return digitar_com_erro(rng, escolhido) if rng.random() < typo_rate else escolhido
+
+    return [
+        {
+            "data": (inicio + timedelta(days=rng.randrange(730))).strftime(rng.choice(formatos)),
+            "nomeProcedimento": rng.choice(nomes_tipos),
+            "nomeMedicos": nome(nomes_medicos),
+            "nomePaciente": nome(nomes_pacientes),
+        }
+        for _ in range(size)
+    ]
+
+
+def linhas_para_csv(linhas: List[Dict[str, str]]) -> bytes:
+    """CSV com separador ';' (como o exportado pelo Excel em pt-BR)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(["Data", "Nome do Procedimento", "Nome dos Médicos", "Nome do Paciente"])
+    for linha in linhas:
+        writer.writerow([linha["data"], linha["nomeProcedimento"], linha["nomeMedicos"], linha["nomePaciente"]])
+    return buffer.getvalue().encode("utf-8")
+
+
+# ============================================
+# MEDIÇÕES
+# ============================================
+
+def rss_mb() -> float:
+    """Memória residente atual (Linux: /proc; senão o pico do processo)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRss:
+    """Amostra o RSS em uma thread enquanto o bloco `with` executa"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+class QueryCounter:
+    """Conta comandos enviados ao banco (evento before_cursor_execute)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+# Rollup e rankings (chaves estrangeiras para médicos / tipos) entram junto:
+# TRUNCATE não apaga tabela referenciada por outra que ficou de fora
+TABELAS = [
+    "procedimentos", "procedimentos_mensal", "rankings",
+    "medicos", "pacientes", "tipos_procedimento", "import_checkpoints",
+]
+
+
+def preparar_banco(force: bool) -> None:
+    """Cria as tabelas e confere que o banco pode ser limpo"""
+    from sqlalchemy import text
+    from app.database import Base, engine
+    import app.models  # noqa: F401 (registra os models)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existentes = conn.execute(text("SELECT COUNT(*) FROM procedimentos")).scalar()
+    if existentes and not force:
+        sys.exit(
+            f"❌ O banco já tem {existentes} procedimentos. O benchmark apaga as tabelas "
+            "de import a cada rodada: use um banco separado ou --force."
+        )
+
+
+def limpar_banco() -> None:
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(TABELAS)}"))
+
+
+def rodar(linhas: List[Dict[str, str]], mode: str, chunk_size: int):
+    """Executa o import pela rota (sem HTTP) e devolve o ImportResult"""
+    from fastapi import Response
+    from app.api import import_routes
+    from app.database import SessionLocal
+    from app.schemas.import_schema import ImportRequest
+
+    usuario = SimpleNamespace(id="benchmark")
+    db = SessionLocal()
+    try:
+        if mode == "upload":
+            from starlette.datastructures import UploadFile
+            arquivo = UploadFile(file=io.BytesIO(linhas_para_csv(linhas)), filename="benchmark.csv")
+            return import_routes.import_procedimentos_upload(
+                file=arquivo, dry_run=False, chunk_size=chunk_size, idempotency_key=None,
+                db=db, current_user=usuario
+            )
+        return import_routes.import_procedimentos(
+            data=ImportRequest(rows=linhas), response=Response(), background=False,
+            dry_run=False, chunk_size=chunk_size, idempotency_key=None,
+            db=db, current_user=usuario
+        )
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+
+    parser = argparse.ArgumentParser(description="Benchmark do import de procedimentos")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tamanhos (linhas), separados por vírgula")
+    parser.add_argument("--medicos", type=int, default=200, help="Médicos distintos na planilha")
+    parser.add_argument("--pacientes", type=int, default=20000, help="Pacientes distintos na planilha")
+    parser.add_argument("--tipos", type=int, default=18, help="Tipos de procedimento distintos")
+    parser.add_argument("--typo-rate", type=float, default=0.02, help="Fração de nomes com erro de digitação (0-1)")
+    parser.add_argument("--date-format", choices=sorted(DATE_FORMATS), default="mixed", help="Formato das datas")
+    parser.add_argument("--mode", choices=["json", "upload"], default="json",
+                        help="json: POST /import/procedimentos; upload: CSV em /import/procedimentos/upload")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Commit a cada N linhas (como ?chunk_size=)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador")
+    parser.add_argument("--database-url", help="Banco usado (padrão: DATABASE_URL do .env)")
+    parser.add_argument("--output", help="Arquivo JSON Lines para acrescentar os resultados (padrão: stdout)")
+    parser.add_argument("--write-csv", metavar="ARQUIVO", help="Só gerar a planilha (maior tamanho) e sair")
+    parser.add_argument("--force", action="store_true", help="Rodar mesmo se o banco já tiver procedimentos")
+
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if args.write_csv:
+        linhas = gerar_linhas(max(sizes), args.medicos, args.pacientes, args.tipos,
+                              args.typo_rate, args.date_format, args.seed)
+        with open(args.write_csv, "wb") as arquivo:
+            arquivo.write(linhas_para_csv(linhas))
+        print(f"✅ {len(linhas)} linhas gravadas em {args.write_csv}", file=sys.stderr)
+        return
+
+    # A URL precisa estar no ambiente antes de importar app.database
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from app.core.config import settings
+    from app.database import engine
+
+    preparar_banco(args.force)
+    saida = open(args.output, "a") if args.output else sys.stdout
+
+    try:
+        for size in sizes:
+            linhas = gerar_linhas(size, args.medicos, args.pacientes, args.tipos,
+                                  args.typo_rate, args.date_format, args.seed)
+            limpar_banco()
+
+            print(f"⏱️  {size} linhas ({args.mode})...", file=sys.stderr)
+            with PeakRss() as memoria, QueryCounter(engine) as queries:
+                inicio = time.perf_counter()
+                result = rodar(linhas, args.mode, args.chunk_size)
+                segundos = time.perf_counter() - inicio
+
+            registro = {
+                "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "commit": git_commit(),
+                "mode": args.mode,
+                "rows": size,
+                "seconds": round(segundos, 3),
+                "rows_per_second": round(size / segundos, 1) if segundos else None,
+                "peak_rss_mb": round(memoria.peak, 1),
+                "queries": queries.count,
+                "success": result.success,
+                "duplicates": result.duplicates,
+                "errors": len(result.errors),
+                "created": result.created,
+                "params": {
+                    "medicos": args.medicos,
+                    "pacientes": args.pacientes,
+                    "tipos": args.tipos,
+                    "typo_rate": args.typo_rate,
+                    "date_format": args.date_format,
+                    "chunk_size": args.chunk_size,
+                    "seed": args.seed,
+                    "batch_size": settings.IMPORT_BATCH_SIZE,
+                    "fuzzy_match": settings.IMPORT_FUZZY_MATCH,
+                    "preprocess_workers": settings.IMPORT_PREPROCESS_WORKERS,
+                },
+            }
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            saida.flush()
+            print(
+                f"   {registro['rows_per_second']} linhas/s, {registro['seconds']}s, "
+                f"pico {registro['peak_rss_mb']} MB, {registro['queries']} queries",
+                file=sys.stderr
+            )
+    finally:
+        limpar_banco()
+        if args.output:
+            saida.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Verifica o número de comandos SQL por requisição (contra N+1)
+
+Chama as rotas de listagem e do dashboard com dados reais do banco e conta
+os comandos enviados (evento before_cursor_execute, inclusive os das
+conexões extras do dashboard). Cada rota tem um limite fixo, que não pode
+depender do tamanho da página: se algum relacionamento voltar a ser
+carregado linha a linha, o número de comandos passa do limite.
+
+Só faz leituras. Precisa de pelo menos um procedimento no banco (ex: depois
+de um import ou de scripts/benchmark_import.py).
+
+Uso:
+    python scripts/check_query_counts.py
+    python scripts/check_query_counts.py --database-url postgresql://localhost/medcontrol_bench
+    python scripts/check_query_counts.py --limit 200 --verbose
+
+Sai com código 1 se algum limite for ultrapassado.
+"""
+
+import argparse
+import os
+import sys
+import threading
+from datetime import date
+
+# Adicionar o diretório raiz ao path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class QueryCounter:
+    """Conta comandos enviados ao banco (evento before_cursor_execute)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self._lock = threading.Lock()  # Dashboard consulta em várias threads
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        with self._lock:
+            self.count += 1
+            self.statements.append(" ".join(statement.split())[:120])
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def casos(db, limit: int):
+    """(nome, limite de comandos, chamada) para cada rota verificada"""
+    from app.api import dashboard_routes, medicos_routes, pacientes_routes, procedimentos_routes
+    from app.models.procedimento import Procedimento
+
+    procedimento = db.query(Procedimento).order_by(Procedimento.data.desc()).first()
+    if procedimento is None:
+        sys.exit("❌ Nenhum procedimento no banco: importe dados antes de rodar a verificação")
+
+    pid, medico_id, paciente_id = str(procedimento.id), str(procedimento.medico_id), str(procedimento.paciente_id)
+    hoje = date.today()
+    db.expunge_all()  # Nada carregado antes das chamadas medidas
+
+    listar = procedimentos_routes.listar_procedimentos
+    filtros = dict(data_inicio=None, data_fim=None, medico_id=None, paciente_id=None, tipo_id=None)
+    pagina = dict(skip=0, limit=limit, paginacao="offset", cursor=None)
+
+    return [
+        ("GET /procedimentos (count=exact)", 2,
+         lambda: listar(**pagina, count="exact", **filtros, fields=None, db=db, current_user=None)),
+        ("GET /procedimentos (count=approximate)", 4,
+         lambda: listar(**pagina, count="approximate", **filtros, fields=None, db=db, current_user=None)),
+        ("GET /procedimentos (paginacao=cursor)", 1,
+         lambda: listar(**{**pagina, "paginacao": "cursor"}, count=None, **filtros, fields=None, db=db, current_user=None)),
+        ("GET /procedimentos (medico_id, count=exact)", 2,
+         lambda: listar(**pagina, count="exact", **{**filtros, "medico_id": medico_id}, fields=None, db=db, current_user=None)),
+        ("GET /procedimentos (fields=data,tipo.nome,valor)", 1,
+         lambda: listar(**pagina, count="none", **filtros, fields="data,tipo.nome,valor", db=db, current_user=None)),
+        ("GET /procedimentos/{id}", 1,
+         lambda: procedimentos_routes.detalhe_procedimento(pid, db=db, current_user=None)),
+        ("GET /medicos/{id}/procedimentos", 2,
+         lambda: medicos_routes.procedimentos_do_medico(medico_id, **pagina, db=db, current_user=None)),
+        ("GET /medicos/{id}/procedimentos (cursor)", 2,
+         lambda: medicos_routes.procedimentos_do_medico(medico_id, **{**pagina, "paginacao": "cursor"},
+                                                        db=db, current_user=None)),
+        ("GET /pacientes/{id}/procedimentos", 2,
+         lambda: pacientes_routes.procedimentos_do_paciente(paciente_id, **pagina, db=db, current_user=None)),
+        ("GET /medicos", 1,
+         lambda: medicos_routes.listar_medicos(skip=0, limit=limit, search=None, fields=None, db=db, current_user=None)),
+        ("GET /pacientes", 1,
+         lambda: pacientes_routes.listar_pacientes(skip=0, limit=limit, search=None, fields=None, db=db, current_user=None)),
+        ("GET /medicos/{id}", 3,
+         lambda: medicos_routes.detalhe_medico(medico_id, db=db, current_user=None)),
+        ("GET /dashboard/stats", 3,
+         lambda: dashboard_routes.dashboard_stats(None, None, db=db, current_user=None)),
+        ("GET /dashboard/relatorio-mensal", 1,
+         lambda: dashboard_routes.relatorio_mensal(hoje.year, hoje.month, db=db, current_user=None)),
+        ("GET /dashboard/series", 1,
+         lambda: dashboard_routes.serie_temporal("month", None, None, None, None, db=db, current_user=None)),
+        ("GET /dashboard/cube", 1,
+         lambda: dashboard_routes.cubo("medico,tipo,mes", "count,sum", "rollup", None, None, db=db, current_user=None)),
+        ("GET /dashboard/valores", 1,
+         lambda: dashboard_routes.distribuicao_valores("tipo", None, None, 10, None, db=db, current_user=None)),
+        ("GET /dashboard/ranking", 1,
+         lambda: dashboard_routes.ranking("paciente", "total", None, None, min(limit, 100), db=db, current_user=None)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o número de comandos SQL por requisição")
+    parser.add_argument("--database-url", help="Banco usado (padrão: DATABASE_URL do .env)")
+    parser.add_argument("--limit", type=int, default=200, help="Tamanho da página nas listagens (máximo 200)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar os comandos executados")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DEBUG"] = "False"  # Sem echo do SQL
+    os.environ["DASHBOARD_CACHE_TTL_SECONDS"] = "0"  # Medir as consultas, não o cache
+
+    from app.database import SessionLocal, engine
+
+    falhas = 0
+    db = SessionLocal()
+    try:
+        for nome, maximo, chamada in casos(db, args.limit):
+            with QueryCounter(engine) as counter:
+                chamada()
+            db.expunge_all()
+
+            ok = counter.count <= maximo
+            falhas += not ok
+            print(f"{'✅' if ok else '❌'} {nome}: {counter.count} comando(s) (máximo {maximo})")
+            if args.verbose or not ok:
+                for statement in counter.statements:
+                    print(f"      {statement}")
+    finally:
+        db.rollback()
+        db.close()
+
+    if falhas:
+        print(f"\n❌ {falhas} rota(s) acima do limite")
+        sys.exit(1)
+    print("\n✅ Todas as rotas dentro do limite")
+
+
+if __name__ == "__main__":
+    main()
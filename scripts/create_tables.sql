@@ -2,10 +2,14 @@
 -- MEDCONTROL - SCRIPT DE CRIAÇÃO DE TABELAS
 -- ============================================
 
+-- Trigramas: busca por trecho de nome / CRM / CPF com índice
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- 1. TABELA DE MÉDICOS
 CREATE TABLE IF NOT EXISTS medicos (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     nome VARCHAR(255) NOT NULL,
+    nome_normalizado VARCHAR(255) NOT NULL,
     crm VARCHAR(50),
     especialidade VARCHAR(100),
     email VARCHAR(255),
@@ -16,10 +20,16 @@ CREATE TABLE IF NOT EXISTS medicos (
 );
 
 CREATE INDEX idx_medicos_nome ON medicos(nome);
+CREATE INDEX ix_medicos_nome_normalizado ON medicos(nome_normalizado);
+-- Homônimos permitidos; o nome só é único entre cadastros sem CRM (chave do import)
+CREATE UNIQUE INDEX ix_medicos_nome_normalizado_sem_crm ON medicos(nome_normalizado) WHERE crm IS NULL;
 CREATE INDEX idx_medicos_crm ON medicos(crm);
+CREATE INDEX IF NOT EXISTS ix_medicos_nome_normalizado_trgm ON medicos USING gin (nome_normalizado gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_medicos_crm_trgm ON medicos USING gin (crm gin_trgm_ops);
 
 COMMENT ON TABLE medicos IS 'Cadastro de médicos';
 COMMENT ON COLUMN medicos.nome IS 'Nome completo do médico';
+COMMENT ON COLUMN medicos.nome_normalizado IS 'Nome sem acentos, minúsculo e com espaços colapsados (busca/import)';
 COMMENT ON COLUMN medicos.crm IS 'Número do CRM com UF (ex: 12345-SP)';
 COMMENT ON COLUMN medicos.especialidade IS 'Especialidade médica';
 
@@ -28,6 +38,7 @@ COMMENT ON COLUMN medicos.especialidade IS 'Especialidade médica';
 CREATE TABLE IF NOT EXISTS pacientes (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     nome VARCHAR(255) NOT NULL,
+    nome_normalizado VARCHAR(255) NOT NULL,
     cpf VARCHAR(14),
     data_nascimento DATE,
     telefone VARCHAR(20),
@@ -39,10 +50,16 @@ CREATE TABLE IF NOT EXISTS pacientes (
 );
 
 CREATE INDEX idx_pacientes_nome ON pacientes(nome);
+CREATE INDEX ix_pacientes_nome_normalizado ON pacientes(nome_normalizado);
+-- Homônimos permitidos; o nome só é único entre cadastros sem CPF (chave do import)
+CREATE UNIQUE INDEX ix_pacientes_nome_normalizado_sem_cpf ON pacientes(nome_normalizado) WHERE cpf IS NULL;
 CREATE INDEX idx_pacientes_cpf ON pacientes(cpf);
+CREATE INDEX IF NOT EXISTS ix_pacientes_nome_normalizado_trgm ON pacientes USING gin (nome_normalizado gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_pacientes_cpf_trgm ON pacientes USING gin (cpf gin_trgm_ops);
 
 COMMENT ON TABLE pacientes IS 'Cadastro de pacientes';
 COMMENT ON COLUMN pacientes.nome IS 'Nome completo do paciente';
+COMMENT ON COLUMN pacientes.nome_normalizado IS 'Nome sem acentos, minúsculo e com espaços colapsados (busca/import)';
 COMMENT ON COLUMN pacientes.cpf IS 'CPF formatado (xxx.xxx.xxx-xx)';
 
 
@@ -50,6 +67,7 @@ COMMENT ON COLUMN pacientes.cpf IS 'CPF formatado (xxx.xxx.xxx-xx)';
 CREATE TABLE IF NOT EXISTS tipos_procedimento (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     nome VARCHAR(255) NOT NULL UNIQUE,
+    nome_normalizado VARCHAR(255) NOT NULL,
     descricao TEXT,
     valor_referencia DECIMAL(10, 2) DEFAULT 0.00,
     ativo BOOLEAN NOT NULL DEFAULT true,
@@ -58,6 +76,7 @@ CREATE TABLE IF NOT EXISTS tipos_procedimento (
 );
 
 CREATE INDEX idx_tipos_procedimento_nome ON tipos_procedimento(nome);
+CREATE UNIQUE INDEX ix_tipos_procedimento_nome_normalizado ON tipos_procedimento(nome_normalizado);
 
 COMMENT ON TABLE tipos_procedimento IS 'Tipos de procedimentos médicos';
 COMMENT ON COLUMN tipos_procedimento.nome IS 'Nome do tipo (ex: Consulta, Exame, Cirurgia)';
@@ -73,18 +92,85 @@ CREATE TABLE IF NOT EXISTS procedimentos (
     paciente_id UUID NOT NULL REFERENCES pacientes(id) ON DELETE RESTRICT,
     observacoes TEXT,
     valor DECIMAL(10, 2),
+    fingerprint VARCHAR(64),
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_procedimentos_data ON procedimentos(data DESC);
+CREATE UNIQUE INDEX ix_procedimentos_fingerprint ON procedimentos(fingerprint);
 CREATE INDEX idx_procedimentos_tipo_id ON procedimentos(tipo_id);
 CREATE INDEX idx_procedimentos_medico_id ON procedimentos(medico_id);
 CREATE INDEX idx_procedimentos_paciente_id ON procedimentos(paciente_id);
+-- Paginação por cursor (ORDER BY data DESC, id DESC)
+CREATE INDEX IF NOT EXISTS ix_procedimentos_data_id ON procedimentos(data, id);
+CREATE INDEX IF NOT EXISTS ix_procedimentos_medico_data_id ON procedimentos(medico_id, data, id);
+CREATE INDEX IF NOT EXISTS ix_procedimentos_paciente_data_id ON procedimentos(paciente_id, data, id);
 
 COMMENT ON TABLE procedimentos IS 'Registro de procedimentos realizados';
 COMMENT ON COLUMN procedimentos.data IS 'Data de realização do procedimento';
 COMMENT ON COLUMN procedimentos.valor IS 'Valor cobrado pelo procedimento';
+COMMENT ON COLUMN procedimentos.fingerprint IS 'SHA-256 de data + nomes normalizados (linhas importadas)';
+
+
+-- ============================================
+-- TABELA: procedimentos_mensal (rollup)
+-- ============================================
+CREATE TABLE IF NOT EXISTS procedimentos_mensal (
+    mes DATE NOT NULL,
+    medico_id UUID NOT NULL REFERENCES medicos(id),
+    tipo_id UUID NOT NULL REFERENCES tipos_procedimento(id),
+    total INTEGER NOT NULL DEFAULT 0,
+    valor DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (mes, medico_id, tipo_id)
+);
+
+CREATE INDEX ix_procedimentos_mensal_medico_id ON procedimentos_mensal(medico_id);
+CREATE INDEX ix_procedimentos_mensal_tipo_id ON procedimentos_mensal(tipo_id);
+
+COMMENT ON TABLE procedimentos_mensal IS 'Totais de procedimentos por mês, médico e tipo (scripts/rebuild_rollup.py recalcula)';
+COMMENT ON COLUMN procedimentos_mensal.mes IS 'Primeiro dia do mês';
+COMMENT ON COLUMN procedimentos_mensal.total IS 'Quantidade de procedimentos';
+COMMENT ON COLUMN procedimentos_mensal.valor IS 'Soma de procedimentos.valor';
+
+-- ============================================
+-- TABELA: rankings (top N por período)
+-- ============================================
+CREATE TABLE IF NOT EXISTS rankings (
+    dimensao VARCHAR(10) NOT NULL,
+    periodo VARCHAR(7) NOT NULL,
+    entidade_id UUID NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    valor DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (dimensao, periodo, entidade_id)
+);
+
+CREATE INDEX ix_rankings_total ON rankings(dimensao, periodo, total DESC, valor DESC, entidade_id);
+CREATE INDEX ix_rankings_valor ON rankings(dimensao, periodo, valor DESC, total DESC, entidade_id);
+
+COMMENT ON TABLE rankings IS 'Totais por médico / tipo / paciente, por mês e geral (scripts/rebuild_rollup.py recalcula)';
+COMMENT ON COLUMN rankings.dimensao IS 'medico, tipo ou paciente';
+COMMENT ON COLUMN rankings.periodo IS 'Mês (YYYY-MM) ou total (todo o histórico)';
+COMMENT ON COLUMN rankings.entidade_id IS 'id do médico, tipo ou paciente';
+
+-- ============================================
+-- TABELA: import_checkpoints
+-- ============================================
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    id VARCHAR(255) PRIMARY KEY,
+    rows_committed INTEGER NOT NULL DEFAULT 0,
+    state JSONB NOT NULL DEFAULT '{}',
+    finished BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE import_checkpoints IS 'Progresso de imports gravados em partes (retomada)';
+COMMENT ON COLUMN import_checkpoints.id IS 'Usuário + Idempotency-Key da importação';
+COMMENT ON COLUMN import_checkpoints.rows_committed IS 'Linhas já lidas (partes com erro ficam em state.failed)';
+COMMENT ON COLUMN import_checkpoints.state IS 'Contadores e erros acumulados até o último commit';
 
 
 -- ============================================
@@ -92,11 +178,11 @@ COMMENT ON COLUMN procedimentos.valor IS 'Valor cobrado pelo procedimento';
 -- ============================================
 
 -- Inserir alguns tipos de procedimento padrão
-INSERT INTO tipos_procedimento (nome, descricao, valor_referencia) VALUES
-    ('Consulta', 'Consulta médica padrão', 200.00),
-    ('Retorno', 'Consulta de retorno', 100.00),
-    ('Exame', 'Exame médico', 150.00),
-    ('Cirurgia', 'Procedimento cirúrgico', 0.00)
+INSERT INTO tipos_procedimento (nome, nome_normalizado, descricao, valor_referencia) VALUES
+    ('Consulta', 'consulta', 'Consulta médica padrão', 200.00),
+    ('Retorno', 'retorno', 'Consulta de retorno', 100.00),
+    ('Exame', 'exame', 'Exame médico', 150.00),
+    ('Cirurgia', 'cirurgia', 'Procedimento cirúrgico', 0.00)
 ON CONFLICT (nome) DO NOTHING;
 
 
@@ -0,0 +1,185 @@
+"""
+Migração: coluna nome_normalizado em médicos, pacientes e tipos
+
+- Cria a coluna (se não existir) e preenche com normalize_name(nome)
+- Mescla registros que passam a ter a mesma chave (mantém o mais antigo e
+  aponta os procedimentos para ele). Em médicos e pacientes a chave é o
+  nome + documento (CRM / CPF): homônimos com documentos diferentes nunca
+  são mesclados
+- Cria os índices: único em tipos; em médicos e pacientes, comum no nome e
+  único só entre os cadastros sem documento (chave usada pelo import)
+- Recalcula o fingerprint dos procedimentos importados com a nova chave
+
+Homônimos com documentos diferentes são listados e a migração é abortada
+sem alterar nada, para conferência. Se forem mesmo pessoas diferentes, rode
+de novo com --manter-homonimos (ficam como cadastros separados).
+
+Uso:
+    python scripts/migrate_nomes_normalizados.py
+    python scripts/migrate_nomes_normalizados.py --manter-homonimos
+"""
+import argparse
+import re
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.core.text import normalize_name
+from app.services.import_engine import row_fingerprint
+
+
+# tabela -> (coluna em procedimentos que referencia a tabela, coluna de documento)
+TABELAS = {
+    "medicos": ("medico_id", "crm"),
+    "pacientes": ("paciente_id", "cpf"),
+    "tipos_procedimento": ("tipo_id", None),
+}
+
+
+class HomonimosEncontrados(Exception):
+    """Mesmo nome normalizado com documentos diferentes (migração abortada)"""
+
+
+def normalizar_documento(documento):
+    """CPF / CRM só com letras e dígitos, em maiúsculas ("123.456.789-00" = "12345678900")"""
+    return re.sub(r"[^0-9A-Za-z]", "", documento).upper() if documento else None
+
+
+def migrar_tabela(db: Session, tabela: str, coluna_fk: str, coluna_documento,
+                  manter_homonimos: bool = False) -> None:
+    """Preenche nome_normalizado, mescla duplicatas e cria os índices"""
+    db.execute(text(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS nome_normalizado VARCHAR(255)"))
+
+    documento_sql = coluna_documento or "NULL"
+    registros = db.execute(text(
+        f"SELECT id, nome, {documento_sql} FROM {tabela} ORDER BY created_at, id"
+    )).all()
+
+    manter = {}  # (chave, documento) -> id mantido
+    duplicados = {}  # id duplicado -> id mantido
+    chaves = {}  # id -> chave
+    documentos = {}  # chave -> documentos distintos (homônimos)
+    for registro_id, nome, documento in registros:
+        chave = normalize_name(nome)
+        documento = normalizar_documento(documento)
+        chaves[registro_id] = chave
+        if documento:
+            documentos.setdefault(chave, set()).add(documento)
+        if (chave, documento) in manter:
+            duplicados[registro_id] = manter[chave, documento]
+        else:
+            manter[chave, documento] = registro_id
+
+    homonimos = {chave: docs for chave, docs in documentos.items() if len(docs) > 1}
+    if homonimos:
+        print(f"   ⚠️  {tabela}: {len(homonimos)} nome(s) com {coluna_documento.upper()} diferentes:")
+        for chave, docs in sorted(homonimos.items()):
+            print(f"      - {chave}: {', '.join(sorted(docs))}")
+        if not manter_homonimos:
+            raise HomonimosEncontrados(
+                f"{tabela}: homônimos com {coluna_documento.upper()} diferentes. Confira os cadastros "
+                "e rode de novo com --manter-homonimos para mantê-los separados"
+            )
+
+    # Mesclar duplicatas
+    for duplicado_id, mantido_id in duplicados.items():
+        db.execute(
+            text(f"UPDATE procedimentos SET {coluna_fk} = :mantido WHERE {coluna_fk} = :duplicado"),
+            {"mantido": mantido_id, "duplicado": duplicado_id}
+        )
+        db.execute(text(f"DELETE FROM {tabela} WHERE id = :id"), {"id": duplicado_id})
+
+    # Preencher chave
+    if manter:
+        db.execute(
+            text(f"UPDATE {tabela} SET nome_normalizado = :chave WHERE id = :id"),
+            [{"chave": chaves[registro_id], "id": registro_id} for registro_id in manter.values()]
+        )
+
+    db.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN nome_normalizado SET NOT NULL"))
+    if coluna_documento is None:
+        db.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{tabela}_nome_normalizado ON {tabela}(nome_normalizado)"
+        ))
+    else:
+        # Índice único da versão anterior desta migração
+        db.execute(text(f"DROP INDEX IF EXISTS ix_{tabela}_nome_normalizado"))
+        db.execute(text(f"CREATE INDEX ix_{tabela}_nome_normalizado ON {tabela}(nome_normalizado)"))
+        db.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{tabela}_nome_normalizado_sem_{coluna_documento} "
+            f"ON {tabela}(nome_normalizado) WHERE {coluna_documento} IS NULL"
+        ))
+
+    print(f"   - {tabela}: {len(manter)} registros, {len(duplicados)} duplicatas mescladas"
+          + (f", {len(homonimos)} nome(s) com homônimos mantidos" if homonimos else ""))
+
+
+def recalcular_fingerprints(db: Session) -> None:
+    """Recalcula fingerprints dos procedimentos importados com a nova normalização"""
+    linhas = db.execute(text("""
+        SELECT p.id, p.data, t.nome, m.nome, pa.nome
+        FROM procedimentos p
+        JOIN tipos_procedimento t ON t.id = p.tipo_id
+        JOIN medicos m ON m.id = p.medico_id
+        JOIN pacientes pa ON pa.id = p.paciente_id
+        WHERE p.fingerprint IS NOT NULL
+        ORDER BY p.created_at, p.id
+    """)).all()
+
+    vistos = set()
+    atualizacoes = []
+    for procedimento_id, data, tipo, medico, paciente in linhas:
+        fingerprint = row_fingerprint(data, tipo, medico, paciente)
+        if fingerprint in vistos:
+            fingerprint = None  # Duplicata após a mesclagem: mantém só a primeira
+        else:
+            vistos.add(fingerprint)
+        atualizacoes.append({"fingerprint": fingerprint, "id": procedimento_id})
+
+    if atualizacoes:
+        # Limpar antes para não violar o índice único durante a troca
+        db.execute(text("UPDATE procedimentos SET fingerprint = NULL WHERE fingerprint IS NOT NULL"))
+        db.execute(
+            text("UPDATE procedimentos SET fingerprint = :fingerprint WHERE id = :id"),
+            atualizacoes
+        )
+
+    print(f"   - procedimentos: {len(atualizacoes)} fingerprints recalculados")
+
+
+def migrar(manter_homonimos: bool = False):
+    """Executa a migração em uma única transação"""
+    db: Session = SessionLocal()
+
+    try:
+        print("🔤 Normalizando nomes...")
+        for tabela, (coluna_fk, coluna_documento) in TABELAS.items():
+            migrar_tabela(db, tabela, coluna_fk, coluna_documento, manter_homonimos)
+
+        recalcular_fingerprints(db)
+
+        db.commit()
+        print("✅ Migração concluída!")
+
+    except HomonimosEncontrados as e:
+        db.rollback()
+        print(f"❌ Migração abortada (nada foi alterado): {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro na migração: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migração de nome_normalizado")
+    parser.add_argument("--manter-homonimos", action="store_true",
+                        help="Manter separados os homônimos com documentos diferentes")
+    migrar(parser.parse_args().manter_homonimos)
@@ -0,0 +1,20 @@
+-- ============================================
+-- MIGRAÇÃO: ÍNDICES DA PAGINAÇÃO POR CURSOR
+-- ============================================
+-- As listagens com paginacao=cursor ordenam por (data, id) e filtram com
+-- (data, id) < (cursor), no geral e por médico / paciente. Com estes
+-- índices cada página lê só as linhas dela, por mais longe que esteja;
+-- sem eles o custo cresce com a profundidade da página.
+--
+-- Bancos criados por scripts/create_tables.sql já têm os índices
+-- (create_all do SQLAlchemy não cria índices em tabelas existentes).
+--
+-- CONCURRENTLY não trava escritas em procedimentos, mas não roda dentro de
+-- transação: execute com psql (autocommit), não num bloco BEGIN/COMMIT.
+--   psql "$DATABASE_URL" -f scripts/migrate_procedimentos_cursor.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_procedimentos_data_id ON procedimentos(data, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_procedimentos_medico_data_id ON procedimentos(medico_id, data, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_procedimentos_paciente_data_id ON procedimentos(paciente_id, data, id);
+
+ANALYZE procedimentos;
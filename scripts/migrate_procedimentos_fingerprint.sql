@@ -0,0 +1,14 @@
+-- ============================================
+-- MIGRAÇÃO: FINGERPRINT DE PROCEDIMENTOS IMPORTADOS
+-- ============================================
+-- Evita duplicatas ao reimportar a mesma planilha: o import grava o hash
+-- (data + tipo + médico + paciente normalizados) e usa
+-- ON CONFLICT (fingerprint) DO NOTHING.
+--
+-- Procedimentos já existentes ficam com fingerprint NULL (não conflitam).
+
+ALTER TABLE procedimentos ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_procedimentos_fingerprint ON procedimentos(fingerprint);
+
+COMMENT ON COLUMN procedimentos.fingerprint IS 'SHA-256 de data + nomes normalizados (linhas importadas)';
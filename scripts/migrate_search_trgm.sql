@@ -0,0 +1,23 @@
+-- ============================================
+-- MIGRAÇÃO: ÍNDICES DE BUSCA (TRIGRAMAS)
+-- ============================================
+-- A busca de médicos e pacientes (parâmetro `search`) procura o termo em
+-- qualquer posição do nome / documento (LIKE '%termo%'). Índices btree não
+-- servem para isso; índices GIN de trigramas (extensão pg_trgm) sim.
+--
+-- O nome é buscado em nome_normalizado (já sem acentos e minúsculo, gravado
+-- pela API), então não é preciso a extensão unaccent.
+--
+-- Sem esta migração a busca funciona igual, só que lendo a tabela inteira.
+-- Em tabelas grandes, prefira CREATE INDEX CONCURRENTLY (fora de transação).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_medicos_nome_normalizado_trgm ON medicos USING gin (nome_normalizado gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_medicos_crm_trgm ON medicos USING gin (crm gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS ix_pacientes_nome_normalizado_trgm ON pacientes USING gin (nome_normalizado gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_pacientes_cpf_trgm ON pacientes USING gin (cpf gin_trgm_ops);
+
+ANALYZE medicos;
+ANALYZE pacientes;
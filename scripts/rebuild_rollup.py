@@ -0,0 +1,51 @@
+"""
+Recalcula o rollup mensal (procedimentos_mensal) e os rankings a partir de
+procedimentos
+
+Rode depois de criar as tabelas num banco que já tem procedimentos, ou depois
+de alterar procedimentos por SQL manual (rollup e rankings só são mantidos
+pelas escritas da aplicação).
+
+Uso:
+    python scripts/rebuild_rollup.py
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine, Base
+from app.models.procedimento_mensal import ProcedimentoMensal
+from app.models.ranking import Ranking
+from app.services import ranking, rollup
+
+
+def reconstruir():
+    """Recria o conteúdo do rollup e dos rankings em uma única transação"""
+    Base.metadata.create_all(bind=engine, tables=[ProcedimentoMensal.__table__, Ranking.__table__])
+
+    db: Session = SessionLocal()
+
+    try:
+        print("📊 Recalculando rollup mensal...")
+        # Bloqueia escritas em procedimentos durante o recálculo
+        db.execute(text("LOCK TABLE procedimentos IN SHARE MODE"))
+        linhas = rollup.reconstruir(db)
+        print(f"✅ Rollup recalculado: {linhas} linhas (mês x médico x tipo)")
+        linhas = ranking.reconstruir(db)
+        print(f"✅ Rankings recalculados: {linhas} linhas")
+        db.commit()
+
+    except Exception as e:
+        print(f"❌ Erro ao recalcular rollup: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reconstruir()
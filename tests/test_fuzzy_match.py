@@ -0,0 +1,53 @@
+"""
+Matching aproximado (app/services/fuzzy_match.py)
+
+Roda sem banco: python -m pytest tests
+"""
+import random
+import string
+
+from app.services.fuzzy_match import NameMatcher, blocking_keys
+
+
+def _nome(rng: random.Random, tamanho: int = 7) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(tamanho))
+
+
+def _nomes(quantidade: int, prenome_comum: str, fracao: float, seed: int = 1):
+    """Nomes de duas palavras; `fracao` deles com o mesmo prenome"""
+    rng = random.Random(seed)
+    nomes = set()
+    while len(nomes) < quantidade:
+        prenome = prenome_comum if rng.random() < fracao else _nome(rng)
+        nomes.add(f"{prenome} {_nome(rng)}")
+    return sorted(nomes)
+
+
+def test_candidatos_por_busca_sao_limitados():
+    nomes = _nomes(20000, "maria", 0.10)
+    matcher = NameMatcher(nomes, threshold=0.75, max_block=50)
+
+    for nome in nomes[:500]:
+        consulta = nome + "x"
+        limite = len(blocking_keys(consulta)) * matcher.max_block
+        assert len(matcher.candidates(consulta)) <= limite
+
+    # O bloco "maria" (~2000 nomes) não entra na busca
+    assert len(matcher.candidates("maria zzzzzzz")) < matcher.max_block
+
+
+def test_erro_de_digitacao_com_prenome_comum():
+    nomes = _nomes(20000, "maria", 0.10)
+    matcher = NameMatcher(nomes, threshold=0.75, max_block=50)
+    alvo = next(nome for nome in nomes if nome.startswith("maria "))
+
+    assert matcher.match(alvo + "a")[0] == alvo
+
+
+def test_variacoes_de_palavras():
+    matcher = NameMatcher(["dr. joao silva", "pedro alvares cabral"], threshold=0.6)
+
+    assert matcher.match("dr joao silva")[0] == "dr. joao silva"
+    assert matcher.match("joao silva")[0] == "dr. joao silva"
+    assert matcher.match("pedro alvarez cabral")[0] == "pedro alvares cabral"
+    assert matcher.match("ana souza") is None
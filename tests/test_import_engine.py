@@ -0,0 +1,104 @@
+"""
+Resolução de nomes do ImportEngine com homônimos (app/services/import_engine.py)
+
+Roda sem banco (sessão falsa): python -m pytest tests
+"""
+import os
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/medcontrol_test")
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from app.models.medico import Medico  # noqa: E402
+from app.services.import_engine import DEFAULTS_MEDICO, ImportEngine  # noqa: E402
+
+
+class FakeResult(list):
+    def scalars(self):
+        return [row[0] for row in self]
+
+
+class FakeSession:
+    """
+    Tabela de médicos em memória: [(nome_normalizado, crm, id)]
+
+    Entende só os comandos do _resolve: busca por nome (IN), lista de nomes
+    do matcher e INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    `agrupar=False` devolve ao matcher todos os nomes, mesmo os ambíguos.
+    """
+
+    def __init__(self, medicos, agrupar: bool = True):
+        self.medicos = list(medicos)
+        self.agrupar = agrupar
+
+    def execute(self, stmt):
+        compilado = stmt.compile(dialect=postgresql.dialect())
+        sql, params = str(compilado), compilado.params
+
+        if stmt.is_insert:
+            criados = FakeResult()
+            for chave, valor in params.items():
+                if not chave.startswith("nome_normalizado"):
+                    continue
+                sem_crm = [m for m in self.medicos if m[0] == valor and m[1] is None]
+                if not sem_crm:
+                    medico = (valor, None, uuid.uuid4())
+                    self.medicos.append(medico)
+                    criados.append((valor, medico[2]))
+            return criados
+
+        if "GROUP BY" in sql:
+            nomes = sorted({m[0] for m in self.medicos})
+            if self.agrupar:
+                nomes = [
+                    nome for nome in nomes
+                    if len([m for m in self.medicos if m[0] == nome]) == 1
+                    or any(m[0] == nome and m[1] is None for m in self.medicos)
+                ]
+            return FakeResult((nome,) for nome in nomes)
+
+        (chaves,) = params.values()
+        return FakeResult(m for m in self.medicos if m[0] in chaves)
+
+
+HOMONIMOS = [
+    ("joao carlos silva", "1111-SP", uuid.uuid4()),
+    ("joao carlos silva", "2222-RJ", uuid.uuid4()),
+    ("maria souza", "3333-SP", uuid.uuid4()),
+]
+
+
+def _resolver(db, nomes):
+    engine = ImportEngine(db, fuzzy_threshold=0.75)
+    criados = engine._resolve(Medico, engine._medicos, nomes, DEFAULTS_MEDICO, (Medico.id,), label="Médico")
+    return engine, criados
+
+
+def test_homonimos_ambiguos_fora_do_matching():
+    db = FakeSession(HOMONIMOS)
+    engine = ImportEngine(db, fuzzy_threshold=0.75)
+
+    assert engine._matcher(Medico).match("joao carlos silvaa") is None
+    assert engine._matcher(Medico).match("maria souzaa")[0] == "maria souza"
+
+
+def test_associacao_a_homonimo_ambiguo_vira_cadastro_novo():
+    # Matcher com o nome ambíguo (ex: cadastro com CRM criado depois de montado)
+    db = FakeSession(HOMONIMOS, agrupar=False)
+    engine, criados = _resolver(db, {"joao carlos silvaa": "João Carlos Silvaa"})
+
+    assert criados == 1
+    assert engine._medicos["joao carlos silvaa"][0] == "joao carlos silvaa"
+    assert not engine.merges
+    assert len(engine.homonyms) == 1 and "joao carlos silva'" in engine.homonyms[0]
+
+
+def test_associacao_a_cadastro_unico():
+    db = FakeSession(HOMONIMOS)
+    engine, criados = _resolver(db, {"maria souzaa": "Maria Souzaa"})
+
+    assert criados == 0
+    assert engine._medicos["maria souzaa"] == ("maria souza", HOMONIMOS[2][2])
+    assert len(engine.merges) == 1